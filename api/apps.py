@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        from api.metrics import install_query_timer
+        from api.routers import install_load_tracker
+
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_load_tracker)
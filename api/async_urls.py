@@ -0,0 +1,13 @@
+"""
+URLconf serving the async user and shirt views, used under ASGI (see ``api/asgi.py``).
+
+Files are served by ``media.aserve``; every other route is shared with ``api.urls``.
+"""
+from django.urls import include, re_path
+
+from api import media, urls
+
+urlpatterns = [
+    re_path('api/(?P<version>(v1|v2))/users/', include('user.async_urls')),
+    re_path('api/(?P<version>(v1|v2))/shirt/', include('shirt.async_urls')),
+] + urls.media_urlpatterns(media.aserve) + urls.urlpatterns
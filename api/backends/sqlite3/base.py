@@ -0,0 +1,49 @@
+"""
+SQLite backend tuned for a web server with concurrent readers and writers.
+
+Every new connection runs the pragmas in ``PRAGMAS``: a write-ahead log, so
+readers no longer block on a writer and vice versa, ``synchronous=NORMAL``,
+which is durable in WAL mode except on power loss, a memory-mapped file and a
+larger page cache, a busy timeout and in-memory temporary tables. Override or
+extend them with ``OPTIONS['pragmas']``.
+
+Transactions start with ``BEGIN IMMEDIATE`` (``OPTIONS['transaction_mode']``).
+A deferred transaction which reads and then writes fails at once with
+"database is locked" when another connection wrote in between, since SQLite
+cannot wait for the lock without deadlocking; taking the write lock up front
+makes it wait for ``busy_timeout`` instead.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    }
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        options = dict(self.PRAGMAS, **params.pop('pragmas', {}))
+        self.pragmas = {name: value for name, value in options.items() if value is not None}
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "settings.DATABASES OPTIONS['transaction_mode'] must be one of {}".format(', '.join(TRANSACTION_MODES)))
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute('PRAGMA {} = {}'.format(name, value))
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN {}'.format(self.transaction_mode))
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from api.cache import detail_cache
+from api.orm import in_integer_range
+
+
+class BatchRetrieveMixin:
+    """
+    Retrieve many objects by primary key with ``?ids=1,5,9``.
+
+    Objects come from ``detail_cache``, shared with the detail views, and the
+    misses from a single ``WHERE id IN (...)`` query on ``get_queryset()``. The
+    response lists the objects in the requested order, and the ids which do not
+    exist (or are filtered out by the queryset) under ``missing``.
+    """
+    ids_query_param = 'ids'
+
+    def get_sparse_fields(self):
+        return None
+
+    def get_batch_ids(self):
+        value = self.request.query_params.get(self.ids_query_param, '')
+        queryset = self.get_queryset()
+        pk_field = queryset.model._meta.pk
+        ids, invalid = {}, []
+        for raw in filter(None, (part.strip() for part in value.split(','))):
+            try:
+                pk = pk_field.to_python(raw)
+            except DjangoValidationError:
+                invalid.append(raw)
+                continue
+            if isinstance(pk, int) and not in_integer_range(pk, pk_field, queryset.db):
+                invalid.append(raw)
+            else:
+                ids[pk] = None
+        if invalid:
+            raise ValidationError({self.ids_query_param: ["Invalid id(s): {}".format(', '.join(invalid))]})
+        if not ids:
+            raise ValidationError({self.ids_query_param: ["A comma-separated list of ids is required."]})
+        if len(ids) > settings.BATCH_MAX_IDS:
+            raise ValidationError({
+                self.ids_query_param: ["At most {} ids can be requested at once".format(settings.BATCH_MAX_IDS)]
+            })
+        return list(ids)
+
+    def get_cached_batch(self, ids):
+        found = detail_cache.get_many(self.get_queryset().model, ids, self.request.build_absolute_uri('/'))
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            found = {
+                pk: {name: value for name, value in data.items() if name in fields}
+                for pk, data in found.items()
+            }
+        return found
+
+    def serialize_batch(self, objects):
+        data = {obj.pk: item for obj, item in zip(objects, self.get_serializer(objects, many=True).data)}
+        # sparse representations are not cached, like in CachedRetrieveMixin
+        if data and self.get_sparse_fields() is None:
+            detail_cache.set_many(self.get_queryset().model, data, self.request.build_absolute_uri('/'))
+        return data
+
+    @staticmethod
+    def batch_response(ids, found):
+        return Response({
+            "results": [found[pk] for pk in ids if pk in found],
+            "missing": [pk for pk in ids if pk not in found],
+        })
+
+    def batch_retrieve(self, request, *args, **kwargs):
+        ids = self.get_batch_ids()
+        found = self.get_cached_batch(ids)
+        misses = [pk for pk in ids if pk not in found]
+        if misses:
+            found.update(self.serialize_batch(list(self.get_queryset().filter(pk__in=misses))))
+        return self.batch_response(ids, found)
+
+    async def abatch_retrieve(self, request, *args, **kwargs):
+        ids = self.get_batch_ids()
+        found = self.get_cached_batch(ids)
+        misses = [pk for pk in ids if pk not in found]
+        if misses:
+            found.update(self.serialize_batch([obj async for obj in self.get_queryset().filter(pk__in=misses)]))
+        return self.batch_response(ids, found)
@@ -0,0 +1,56 @@
+from django.conf import settings
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    List serializer validating every item on its own.
+    """
+
+    def validate_items(self, items):
+        """
+        Validate every item on its own so that one invalid item does not reject
+        the whole batch. ``items`` maps the position of each item in the request
+        to its data; the validated attributes and the errors are returned keyed
+        the same way.
+        """
+        validated, errors = {}, {}
+        for index, item in items.items():
+            try:
+                validated[index] = self.child.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        return validated, errors
+
+
+class BulkMixin:
+    """
+    Helpers for views taking a JSON array of items and reporting a result per item.
+    """
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"message": "Expected a list of items"})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({
+                "message": "At most {} items can be sent at once".format(settings.BULK_MAX_ITEMS)
+            })
+        return items
+
+    @staticmethod
+    def bulk_response(results, errors, success_status):
+        for index, detail in errors.items():
+            results[index] = {"index": index, "status": "error", "errors": detail}
+        if not errors:
+            response_status = success_status
+        elif len(errors) < len(results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            data={"results": [results[index] for index in sorted(results)]},
+            status=response_status
+        )
@@ -0,0 +1,199 @@
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework.response import Response
+
+
+class CacheStats:
+    """
+    Thread-safe hit/miss counters, one pair per model label
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, label, hit):
+        with self._lock:
+            self._counts[label]['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {label: dict(counts) for label, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class DetailCache:
+    """
+    Read-through cache of serialized detail payloads.
+
+    Every entry key embeds a per-object version token. Writes replace the token
+    instead of deleting entries, so every variant of an object (one per host the
+    absolute URLs were rendered for) is invalidated with a single cache write and
+    stale entries simply expire.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @property
+    def cache(self):
+        return caches[settings.DETAIL_CACHE_ALIAS]
+
+    @staticmethod
+    def version_key(model, pk):
+        return 'detail:{}:{}:version'.format(model._meta.label_lower, pk)
+
+    def get_version(self, model, pk):
+        key = self.version_key(model, pk)
+        version = self.cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not self.cache.add(key, version, None):
+                version = self.cache.get(key, version)
+        return version
+
+    def get_versions(self, model, pks):
+        """
+        ``get_version`` of many objects with one cache round trip for the
+        existing tokens
+        """
+        keys = {self.version_key(model, pk): pk for pk in pks}
+        versions = self.cache.get_many(list(keys))
+        return {
+            pk: versions[key] if key in versions else self.get_version(model, pk)
+            for key, pk in keys.items()
+        }
+
+    @staticmethod
+    def entry_key(model, pk, version, variant):
+        return 'detail:{}:{}:{}:{}'.format(
+            model._meta.label_lower,
+            pk,
+            version,
+            hashlib.md5(variant.encode()).hexdigest()
+        )
+
+    def key(self, model, pk, variant=''):
+        return self.entry_key(model, pk, self.get_version(model, pk), variant)
+
+    def get(self, model, pk, variant=''):
+        data = self.cache.get(self.key(model, pk, variant))
+        self.stats.record(model._meta.label_lower, data is not None)
+        return data
+
+    def set(self, model, pk, data, variant=''):
+        self.cache.set(self.key(model, pk, variant), data, settings.DETAIL_CACHE_TIMEOUT)
+
+    def get_many(self, model, pks, variant=''):
+        """
+        Return ``{pk: data}`` of the cached objects among ``pks``
+        """
+        keys = {
+            self.entry_key(model, pk, version, variant): pk
+            for pk, version in self.get_versions(model, pks).items()
+        }
+        entries = self.cache.get_many(list(keys))
+        label = model._meta.label_lower
+        for key in keys:
+            self.stats.record(label, key in entries)
+        return {keys[key]: data for key, data in entries.items()}
+
+    def set_many(self, model, items, variant=''):
+        """
+        Cache ``{pk: data}``
+        """
+        versions = self.get_versions(model, items)
+        self.cache.set_many({
+            self.entry_key(model, pk, versions[pk], variant): data
+            for pk, data in items.items()
+        }, settings.DETAIL_CACHE_TIMEOUT)
+
+    def invalidate(self, model, pk):
+        """
+        Drop every cached variant of an object. The version is replaced right away
+        and once more after the surrounding transaction commits, so that a reader
+        which repopulated the cache with pre-commit data does not keep serving it.
+        """
+
+        def bump():
+            self.cache.set(self.version_key(model, pk), uuid.uuid4().hex, None)
+
+        bump()
+        transaction.on_commit(bump)
+
+
+detail_cache = DetailCache()
+
+
+def get_lookup_pk(view):
+    """
+    Return the primary key a detail view was called for, converted to its Python
+    type so that ``"01"`` and ``"1"`` share cache entries, or ``None`` when the URL
+    value is not a valid primary key.
+    """
+    model = view.get_queryset().model
+    try:
+        return model._meta.pk.to_python(view.kwargs[view.lookup_url_kwarg or view.lookup_field])
+    except ValidationError:
+        return None
+
+
+class CachedRetrieveMixin:
+    """
+    Serve ``retrieve`` from ``detail_cache``. Models using this mixin must call
+    ``detail_cache.invalidate`` whenever an object changes, which is done from
+    the ``post_save``/``post_delete`` receivers and from every write path that
+    bypasses them.
+
+    Entries hold the full representation. Requests for a sparse fieldset (see
+    ``api.sparse``) are answered from it on a hit, and fetch only their columns
+    without filling the cache on a miss.
+    """
+
+    def get_sparse_fields(self):
+        return None
+
+    def get_cached(self, request, pk):
+        model = self.get_queryset().model
+        data = detail_cache.get(model, pk, request.build_absolute_uri('/'))
+        if data is None:
+            return None
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            data = {name: value for name, value in data.items() if name in fields}
+        return Response(data, headers={'X-Cache': 'HIT'})
+
+    def set_cached(self, request, pk, response):
+        if self.get_sparse_fields() is None:
+            model = self.get_queryset().model
+            detail_cache.set(model, pk, dict(response.data), request.build_absolute_uri('/'))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = get_lookup_pk(self)
+        if pk is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = self.get_cached(request, pk)
+        if response is None:
+            response = self.set_cached(request, pk, super().retrieve(request, *args, **kwargs))
+        return response
+
+    async def aretrieve(self, request, *args, **kwargs):
+        pk = get_lookup_pk(self)
+        if pk is None:
+            return await super().aretrieve(request, *args, **kwargs)
+        response = self.get_cached(request, pk)
+        if response is None:
+            response = self.set_cached(request, pk, await super().aretrieve(request, *args, **kwargs))
+        return response
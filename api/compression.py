@@ -0,0 +1,174 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` compresses responses with the first encoding of
+``COMPRESSION_ENCODINGS`` that the client accepts (``Accept-Encoding`` with
+q-values). zstd and brotli are used when the ``zstandard`` / ``brotli``
+packages are installed; gzip is always available. Only text-like media types
+of at least ``COMPRESSION_MIN_SIZE`` bytes are compressed. Streaming responses
+are compressed chunk by chunk and flushed after every chunk, so they keep
+streaming. Strong ETags are weakened, like Django's ``GZipMiddleware`` does.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/([\w.+-]+\+)?(json|x-ndjson|msgpack|javascript|xml|yaml)\b|image/svg\+xml)', re.I)
+
+
+class Gzip:
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def compressor(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+class Brotli:
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def compressor(self):
+        compressor = brotli.Compressor(quality=self.level)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+
+
+class Zstd:
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compressor(self):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                compressor.flush)
+
+
+CODECS = {'gzip': Gzip}
+if brotli is not None:
+    CODECS['br'] = Brotli
+if zstandard is not None:
+    CODECS['zstd'] = Zstd
+
+
+def get_codec(name):
+    return CODECS[name](settings.COMPRESSION_LEVELS[name])
+
+
+def parse_accept_encoding(header):
+    """
+    Map each coding of an ``Accept-Encoding`` header to its quality
+    """
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r'\bq=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities
+
+
+def negotiate(header):
+    """
+    The available encoding the client prefers, ties going to the order of
+    ``COMPRESSION_ENCODINGS``, or ``None``
+    """
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0
+    for name in settings.COMPRESSION_ENCODINGS:
+        if name not in CODECS:
+            continue
+        quality = qualities.get(name, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress_stream(codec, chunks):
+    process, finish = codec.compressor()
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(codec, chunks):
+    process, finish = codec.compressor()
+    async for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or response.status_code == 206
+                or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        codec = get_codec(encoding)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(codec, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # the compressed body is not byte-identical to the resource, see RFC 9110 section 8.8.1
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,247 @@
+import datetime
+import hashlib
+from functools import partial, wraps
+
+from django.conf import settings
+from django.utils import timezone
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import condition
+
+from api.cache import detail_cache, get_lookup_pk
+from api.models import TableVersion
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def representation(request):
+    """
+    Request attributes which change the response body of the same resource state
+    """
+    return request.META.get('QUERY_STRING', ''), request.META.get('HTTP_ACCEPT', '')
+
+
+def representation_etag(state, request):
+    """
+    ETag of the representation ``request`` gets of the resource ``state``:
+    ``<state>-<representation>`` for reads, the bare state for writes, whose
+    preconditions hold for whichever representation the client holds.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return state
+    return '{}-{}'.format(state, make_etag(*representation(request))[:8])
+
+
+def etag_state(etag):
+    # compression makes ETags weak (W/"..."), the state is unchanged
+    return (etag[2:] if etag.startswith('W/') else etag).strip('"').split('-')[0]
+
+
+def check_preconditions(request, etag, last_modified):
+    """
+    Return ``412 Precondition Failed`` when ``If-Match``/``If-Unmodified-Since``
+    do not hold for the resource state, else ``None``. ``If-Match`` tags of any
+    representation of the current state match.
+    """
+    if 'HTTP_IF_MATCH' in request.META:
+        tags = parse_etags(request.META['HTTP_IF_MATCH'])
+        if etag is None or not ('*' in tags or any(etag_state(tag) == etag for tag in tags)):
+            return HttpResponse(status=412)
+    elif 'HTTP_IF_UNMODIFIED_SINCE' in request.META:
+        since = parse_http_date_safe(request.META['HTTP_IF_UNMODIFIED_SINCE'])
+        if since is not None and (not last_modified or int(last_modified.timestamp()) > since):
+            return HttpResponse(status=412)
+    return None
+
+
+def precondition_failed():
+    return HttpResponse(status=412)
+
+
+def match_preconditions(view, request, etag, last_modified):
+    """
+    ``check_preconditions`` for ``view``. When they hold, the matched
+    ``last_modified`` is kept as ``view.matched_last_modified`` for the write to
+    be applied to that state only (see ``ObjectValidatorsMixin``).
+    """
+    response = check_preconditions(request, etag, last_modified)
+    if response is None and request.META.get('HTTP_IF_MATCH', '').strip() != '*':
+        view.matched_last_modified = last_modified
+    return response
+
+
+def conditional(method):
+    """
+    Decorate a view method with ``ETag``/``Last-Modified`` handling.
+
+    The validators come from the view's ``get_validators()``. Safe requests are
+    answered with ``304 Not Modified`` when ``If-None-Match``/``If-Modified-Since``
+    match. Unsafe requests are checked against ``If-Match``/``If-Unmodified-Since``
+    and answered with ``412 Precondition Failed`` on a mismatch; the validators
+    are not computed at all when an unsafe request carries no precondition.
+    Authorization has to be checked before, so that a 412 does not tell
+    unauthorized clients whether the resource changed.
+    """
+
+    @wraps(method)
+    def inner(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            if 'HTTP_IF_MATCH' in request.META or 'HTTP_IF_UNMODIFIED_SINCE' in request.META:
+                response = match_preconditions(self, request, *self.get_validators(request))
+                if response is not None:
+                    return response
+            return method(self, request, *args, **kwargs)
+
+        validators = []
+
+        def get_validators():
+            if not validators:
+                validators.extend(self.get_validators(request))
+            return validators
+
+        return condition(
+            etag_func=lambda *a, **k: get_validators()[0],
+            last_modified_func=lambda *a, **k: get_validators()[1],
+        )(partial(method, self))(request, *args, **kwargs)
+
+    return inner
+
+
+def aconditional(method):
+    """
+    ``conditional`` for coroutine view methods, validators coming from the view's
+    ``aget_validators()``. Mirrors Django's ``condition`` decorator, which only
+    wraps synchronous views.
+    """
+
+    @wraps(method)
+    async def inner(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            if 'HTTP_IF_MATCH' in request.META or 'HTTP_IF_UNMODIFIED_SINCE' in request.META:
+                response = match_preconditions(self, request, *await self.aget_validators(request))
+                if response is not None:
+                    return response
+            return await method(self, request, *args, **kwargs)
+
+        etag, last_modified = await self.aget_validators(request)
+        etag = quote_etag(etag) if etag is not None else None
+        if last_modified:
+            if not timezone.is_aware(last_modified):
+                last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+            last_modified = int(last_modified.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await method(self, request, *args, **kwargs)
+
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        return response
+
+    return inner
+
+
+class ListValidatorsMixin:
+    """
+    Validators of a list view, derived from the table's ``TableVersion`` row,
+    which database triggers bump on every write: one primary key lookup, shared
+    by every worker, instead of a scan of the table. Tables without the row get
+    no validators. The filters and the cursor are part of the query string, and
+    so of the ETag.
+    """
+
+    def get_validators(self, request):
+        model = self.get_queryset().model
+        return self.make_validators(request, model, TableVersion.state_queryset(model).first())
+
+    async def aget_validators(self, request):
+        model = self.get_queryset().model
+        return self.make_validators(request, model, await TableVersion.state_queryset(model).afirst())
+
+    @staticmethod
+    def make_validators(request, model, state):
+        if state is None:
+            return None, None
+        version, changed_at = state
+        etag = make_etag(model._meta.label_lower, request.path, version, changed_at.isoformat())
+        return representation_etag(etag, request), changed_at
+
+
+class ObjectValidatorsMixin:
+    """
+    Validators of a single object, derived from its ``updated_at``. For reads the
+    timestamp is kept in ``detail_cache`` so that a conditional request for a
+    cached object does not query the database. Preconditions of writes are
+    checked against the database, and the write has to be applied through
+    ``precondition_queryset()`` so that the check and the UPDATE are one
+    statement: a row changed in between is not overwritten, the UPDATE matches
+    nothing and the view answers ``precondition_failed()``.
+    """
+    validators_variant = 'last-modified'
+    matched_last_modified = None
+
+    def last_modified_queryset(self, pk):
+        return self.get_queryset().filter(pk=pk).values_list('updated_at', flat=True)
+
+    def get_object_last_modified(self, pk, cached=True):
+        if not cached:
+            return self.last_modified_queryset(pk).first()
+        model = self.get_queryset().model
+        key = detail_cache.key(model, pk, self.validators_variant)
+        last_modified = detail_cache.cache.get(key)
+        if last_modified is None:
+            last_modified = self.last_modified_queryset(pk).first()
+            if last_modified is not None:
+                detail_cache.cache.set(key, last_modified, settings.DETAIL_CACHE_TIMEOUT)
+        return last_modified
+
+    async def aget_object_last_modified(self, pk, cached=True):
+        if not cached:
+            return await self.last_modified_queryset(pk).afirst()
+        model = self.get_queryset().model
+        key = detail_cache.key(model, pk, self.validators_variant)
+        last_modified = detail_cache.cache.get(key)
+        if last_modified is None:
+            last_modified = await self.last_modified_queryset(pk).afirst()
+            if last_modified is not None:
+                detail_cache.cache.set(key, last_modified, settings.DETAIL_CACHE_TIMEOUT)
+        return last_modified
+
+    def get_validators(self, request):
+        pk = get_lookup_pk(self)
+        cached = request.method in ('GET', 'HEAD')
+        return self.make_validators(request, pk, pk is not None and self.get_object_last_modified(pk, cached))
+
+    async def aget_validators(self, request):
+        pk = get_lookup_pk(self)
+        cached = request.method in ('GET', 'HEAD')
+        return self.make_validators(request, pk, pk is not None and await self.aget_object_last_modified(pk, cached))
+
+    def precondition_queryset(self, queryset):
+        """
+        Narrow the queryset of a write to the state its preconditions matched
+        """
+        if self.matched_last_modified is None:
+            return queryset
+        return queryset.filter(updated_at=self.matched_last_modified)
+
+    def make_validators(self, request, pk, last_modified):
+        if not last_modified:
+            return None, None
+        state = make_etag(self.get_queryset().model._meta.label_lower, pk, last_modified.isoformat())
+        return representation_etag(state, request), last_modified
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with ``304 Not Modified`` when the client's copy is current
+    """
+
+    @conditional
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
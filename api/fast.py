@@ -0,0 +1,130 @@
+"""
+Read-only list serialization straight from ``values_list()`` rows.
+
+A ``ModelSerializer`` builds a model instance per row and runs every field
+through DRF's generic field pipeline. For list endpoints ``FastListMixin``
+instead compiles the serializer's fields once per request into column names
+and per-column transforms, fetches plain tuples and zips them into dicts. The
+output is the same as the serializer's; serializers with fields that cannot be
+read from a single column (relations, nested serializers, method fields, ...)
+keep using the serializer.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.export import file_url
+from api.metrics import serializing
+from api.pagination import ordering_fields
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+
+# fields whose to_representation() of a column value returns it unchanged
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+# representations FastJSONRenderer would not encode like DRF
+UNSUPPORTED_FIELDS = (serializers.FloatField, serializers.RelatedField, serializers.ManyRelatedField,
+                      serializers.SerializerMethodField, serializers.BaseSerializer)
+
+
+def file_transform(field, storage, request):
+    """
+    ``FileField.to_representation()`` of a stored file name
+    """
+    if getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        if request is not None:
+            return file_url(request, storage)
+        return lambda name: storage.url(name) if name else None
+    return lambda name: name or None
+
+
+class RowSerializer:
+    """
+    Compiled serializer: ``columns`` to fetch, in the order of the
+    serializer's fields, and ``to_dicts(rows)``. Columns past the serializer's
+    fields are fetched but left out of the dicts.
+    """
+
+    def __init__(self, columns, names, transforms):
+        self.columns = columns
+        self.names = names
+        self.transforms = transforms
+
+    @classmethod
+    def compile(cls, serializer):
+        """
+        Return the ``RowSerializer`` of ``serializer``'s fields, or ``None`` when
+        one of them is not a plain column
+        """
+        model = serializer.Meta.model
+        context = serializer.context
+        columns, names, transforms = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, UNSUPPORTED_FIELDS) or len(field.source_attrs) != 1:
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.is_relation:
+                return None
+
+            columns.append(model_field.attname)
+            names.append(name)
+            if isinstance(field, serializers.FileField):
+                transforms.append((name, file_transform(field, model_field.storage, context.get('request'))))
+            elif not isinstance(field, IDENTITY_FIELDS):
+                transforms.append((name, field.to_representation))
+        return cls(columns, names, transforms)
+
+    def to_dicts(self, rows):
+        names, transforms = self.names, self.transforms
+        with serializing():
+            items = [dict(zip(names, row)) for row in rows]
+            for name, transform in transforms:
+                for item in items:
+                    value = item[name]
+                    if value is not None:
+                        item[name] = transform(value)
+        return items
+
+
+class FastListMixin:
+    """
+    ``list()`` and ``alist()`` rendering the fields of ``get_serializer()`` from
+    ``values_list()`` tuples, with JSON encoded by orjson.
+    """
+    renderer_classes = [FastJSONRenderer, MessagePackRenderer, BrowsableAPIRenderer]
+
+    def get_row_serializer(self):
+        rows = RowSerializer.compile(self.get_serializer())
+        if rows is not None:
+            # the cursor paginator reads its ordering fields by attribute, even when ?fields= leaves them out
+            rows.columns += [name for name in ordering_fields(self.paginator) if name not in rows.columns]
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values_list(*rows.columns, named=True))
+        if page is not None:
+            return self.get_paginated_response(rows.to_dicts(page))
+        return Response(rows.to_dicts(queryset.values_list(*rows.columns)))
+
+    async def alist(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        if rows is None:
+            return await super().alist(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await sync_to_async(self.paginate_queryset)(queryset.values_list(*rows.columns, named=True))
+            if page is not None:
+                return self.get_paginated_response(rows.to_dicts(page))
+        return Response(rows.to_dicts([row async for row in queryset.values_list(*rows.columns)]))
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import schema
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifacts served at /swagger.json and /swagger.yaml'
+
+    def handle(self, *args, **options):
+        schema.write_artifacts()
+        self.stdout.write('Wrote OpenAPI schema {} to {}'.format(schema.code_hash()[:12], settings.API_SCHEMA_DIR))
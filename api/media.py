@@ -0,0 +1,181 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from api.storage import is_hashed_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def parse_range(header, size):
+    """
+    Parse a single ``bytes=`` range against a file of ``size`` bytes.
+
+    Returns ``(start, end)`` with an inclusive ``end``, ``None`` when the header
+    should be ignored (missing, malformed or several ranges) and ``False`` when
+    the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_range(path, start, length, block_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def aiter_range(path, start, length, block_size=64 * 1024):
+    """
+    ``iter_range`` as an async iterator, every read done in a worker thread
+    """
+    f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+    try:
+        await sync_to_async(f.seek, thread_sensitive=False)(start)
+        while length > 0:
+            chunk = await sync_to_async(f.read, thread_sensitive=False)(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        await sync_to_async(f.close, thread_sensitive=False)()
+
+
+def cache_control(path):
+    if is_hashed_name(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return 'public, max-age={}'.format(settings.MEDIA_CACHE_MAX_AGE)
+
+
+def offload_response(path, fullpath, content_type):
+    """
+    Let the front-end web server send the file (``MEDIA_SENDFILE``)
+    """
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+    else:
+        response['X-Sendfile'] = fullpath
+    return response
+
+
+def serve(request, path, document_root=None, asynchronous=False):
+    """
+    Serve a file from ``document_root``, ``MEDIA_ROOT`` by default.
+
+    Whole files are returned as a ``FileResponse``, which WSGI servers send with
+    ``sendfile()`` through ``wsgi.file_wrapper``. Single byte ranges, conditional
+    requests and caching headers are supported, and ``MEDIA_SENDFILE`` hands the
+    transfer over to nginx (``X-Accel-Redirect``) or Apache/lighttpd
+    (``X-Sendfile``) entirely. With ``asynchronous`` the body is an async
+    iterator, see ``aserve``.
+    """
+    try:
+        fullpath = safe_join(document_root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    etag = '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE and document_root is None:
+        response = offload_response(path, fullpath, content_type)
+    else:
+        byte_range = None
+        if 'HTTP_RANGE' in request.META and if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(stat.st_size)
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                (aiter_range if asynchronous else iter_range)(fullpath, start, end - start + 1),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, stat.st_size)
+        elif asynchronous:
+            response = StreamingHttpResponse(aiter_range(fullpath, 0, stat.st_size), content_type=content_type)
+            response['Content-Length'] = stat.st_size
+        else:
+            response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Whether a ``Range`` request applies: without ``If-Range`` it always does,
+    otherwise only if the client's validator still matches the file.
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+async def aserve(request, path, document_root=None):
+    """
+    ``serve`` for the async URLconf. Under ASGI Django collects the synchronous
+    iterator of a ``FileResponse`` into a list before sending it, so the file is
+    streamed from an async iterator instead, one block at a time.
+    """
+    return await sync_to_async(serve, thread_sensitive=False)(request, path, document_root, asynchronous=True)
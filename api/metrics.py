@@ -0,0 +1,249 @@
+"""
+In-process request metrics per named route, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` counts every request and, for the fraction of requests set
+by ``METRICS_SAMPLE_RATE``, records the latency, the number and duration of
+database queries, the response size and the time spent serializing. Sampled
+responses also carry a ``Server-Timing`` header. Metrics are kept per process;
+each worker reports its own.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """
+    Cumulative buckets, sum and count, like a Prometheus histogram
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+class Registry:
+    """
+    Thread-safe store of the request counters and histograms, keyed by labels
+    """
+    histograms = (
+        ('api_request_duration_seconds', 'Request latency', LATENCY_BUCKETS),
+        ('api_db_queries', 'Database queries per request', QUERY_BUCKETS),
+        ('api_db_duration_seconds', 'Time spent in database queries per request', LATENCY_BUCKETS),
+        ('api_serializer_duration_seconds', 'Time spent serializing per request', LATENCY_BUCKETS),
+        ('api_response_size_bytes', 'Response body size', SIZE_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.values = {
+                name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+                for name, _, buckets in self.histograms
+            }
+
+    def record(self, route, method, status, sample=None, duration=None, size=None):
+        with self._lock:
+            self.requests[(route, method, str(status))] += 1
+            if sample is None:
+                return
+            labels = (route, method)
+            self.values['api_request_duration_seconds'][labels].observe(duration)
+            self.values['api_db_queries'][labels].observe(sample.queries)
+            self.values['api_db_duration_seconds'][labels].observe(sample.db_time)
+            self.values['api_serializer_duration_seconds'][labels].observe(sample.serializer_time)
+            if size is not None:
+                self.values['api_response_size_bytes'][labels].observe(size)
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format
+        """
+        lines = [
+            '# HELP api_requests_total Requests by route, method and status',
+            '# TYPE api_requests_total counter',
+        ]
+        with self._lock:
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append('api_requests_total{{route="{}",method="{}",status="{}"}} {}'.format(
+                    route, method, status, count))
+            for name, description, _ in self.histograms:
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} histogram'.format(name))
+                for (route, method), histogram in sorted(self.values[name].items()):
+                    labels = 'route="{}",method="{}"'.format(route, method)
+                    for bound, count in histogram.samples():
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, count))
+                    lines.append('{}_sum{{{}}} {}'.format(name, labels, histogram.sum))
+                    lines.append('{}_count{{{}}} {}'.format(name, labels, histogram.count))
+        lines.append('# HELP api_metrics_sample_rate Fraction of requests with detailed metrics')
+        lines.append('# TYPE api_metrics_sample_rate gauge')
+        lines.append('api_metrics_sample_rate {}'.format(settings.METRICS_SAMPLE_RATE))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Sample:
+    """
+    Measurements of one sampled request, filled in while it is handled
+    """
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` installed on every connection; only sampled requests pay
+    for the timing.
+    """
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_time += time.perf_counter() - start
+        sample.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@contextmanager
+def serializing():
+    """
+    Add the time spent in the block to the sampled request's serializer time.
+    Nested blocks are only counted once.
+    """
+    sample = _current.get()
+    if sample is None or sample.serializing:
+        yield
+        return
+    sample.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serializer_time += time.perf_counter() - start
+        sample.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+    Count the time spent in ``to_representation()`` as serializer time
+    """
+
+    def to_representation(self, instance):
+        if _current.get() is None:
+            return super().to_representation(instance)
+        with serializing():
+            return super().to_representation(instance)
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Record the metrics of every request. Put it first in ``MIDDLEWARE`` so that
+    the latency covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self.finish(request, response, sample, start)
+
+    async def __acall__(self, request):
+        sample, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        return self.finish(request, response, sample, start)
+
+    @staticmethod
+    def start():
+        if settings.METRICS_SAMPLE_RATE <= 0 or random.random() >= settings.METRICS_SAMPLE_RATE:
+            return None, None, None
+        sample = Sample()
+        return sample, _current.set(sample), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, sample, start):
+        route = route_name(request)
+        if sample is None:
+            registry.record(route, request.method, response.status_code)
+            return response
+
+        duration = time.perf_counter() - start
+        registry.record(route, request.method, response.status_code, sample, duration, response_size(response))
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = 'app;dur={:.1f}, db;dur={:.1f};desc="{} queries", ser;dur={:.1f}'.format(
+                duration * 1000, sample.db_time * 1000, sample.queries, sample.serializer_time * 1000)
+        return response
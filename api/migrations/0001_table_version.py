@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+# PostgreSQL bumps the counter once per statement, through one function shared by
+# the triggers the app migrations install; SQLite only has row-level triggers,
+# which carry the UPDATE themselves.
+POSTGRESQL_CREATE = [
+    """
+    CREATE FUNCTION api_table_version_bump() RETURNS trigger AS $$
+    BEGIN
+        UPDATE api_tableversion SET version = version + 1, changed_at = clock_timestamp()
+        WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+POSTGRESQL_DROP = ['DROP FUNCTION api_table_version_bump()']
+
+
+def create_function(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_function(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('table_name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_function, drop_function),
+    ]
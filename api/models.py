@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class TableVersion(models.Model):
+    """
+    Change counter of a table. Database triggers installed by the app
+    migrations bump ``version`` and ``changed_at`` on every insert, update and
+    delete of its rows, whichever process or path writes them, so list
+    validators can be read from one row instead of the table.
+    """
+    table_name = models.CharField(max_length=255, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    @classmethod
+    def state_queryset(cls, model):
+        return cls.objects.filter(table_name=model._meta.db_table).values_list('version', 'changed_at')
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from api.renderers import MessagePackRenderer
+
+
+class VersionedContentNegotiation(DefaultContentNegotiation):
+    """
+    Prefer MessagePack for the API versions in ``COMPACT_API_VERSIONS`` when the
+    client accepts any media type. Clients asking for JSON (``Accept`` or
+    ``?format=json``) still get it.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        # content negotiation runs before versioning, so read the URL kwarg
+        version = (getattr(request, 'parser_context', None) or {}).get('kwargs', {}).get('version')
+        if version in settings.COMPACT_API_VERSIONS and self.get_accept_list(request) == ['*/*']:
+            renderers = sorted(renderers, key=lambda renderer: not isinstance(renderer, MessagePackRenderer))
+        return super().select_renderer(request, renderers, format_suffix)
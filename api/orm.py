@@ -0,0 +1,116 @@
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import signals, sql
+
+
+def supports_update_returning(connection):
+    """
+    Whether ``connection`` understands ``UPDATE ... RETURNING`` (PostgreSQL and
+    SQLite 3.35+).
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+# the widest integer any backend (and SQLite's driver) can bind
+BIGINT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def in_integer_range(value, field, using=DEFAULT_DB_ALIAS):
+    """
+    Whether the integer ``value`` fits the column of ``field`` on the database
+    ``using``. Larger values fail in the driver (``OverflowError`` on SQLite,
+    "out of range" on PostgreSQL) rather than matching nothing, so they have to
+    be rejected as invalid input. Backends which do not bound the column
+    (SQLite) are bounded to 64 bits.
+    """
+    min_value, max_value = connections[using].ops.integer_field_range(field.get_internal_type())
+    if min_value is None:
+        min_value = BIGINT_RANGE[0]
+    if max_value is None:
+        max_value = BIGINT_RANGE[1]
+    return min_value <= value <= max_value
+
+
+def update_returning(queryset, values):
+    """
+    Update the rows of ``queryset`` with ``values`` and return them as model
+    instances.
+
+    Only the columns in ``values`` are written and, where the backend supports
+    it, the rows come back from the same ``UPDATE ... RETURNING`` statement, so
+    the whole write is a single query. Other backends, and models whose rows
+    span several tables (multi-table inheritance), fall back to a ``SELECT``
+    after the ``UPDATE``.
+    """
+    model = queryset.model
+    # route to the primary like QuerySet.update() does
+    queryset = queryset.all()
+    queryset._for_write = True
+    connection = connections[queryset.db]
+
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    # the UPDATEs of parent tables are only run by the compiler's execute_sql()
+    if model._meta.parents or query.related_updates or not supports_update_returning(connection):
+        if not queryset.update(**values):
+            return []
+        return list(queryset)
+
+    compiler = query.get_compiler(queryset.db)
+    # as_sql() runs pre_sql_setup(), which turns filters on joined tables into a pk__in subquery
+    update_sql, params = compiler.as_sql()
+
+    fields = model._meta.concrete_fields
+    returning = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute('{} RETURNING {}'.format(update_sql, returning), params)
+        rows = cursor.fetchall()
+
+    converters = compiler.get_converters([field.get_col(model._meta.db_table) for field in fields])
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+    attnames = [field.attname for field in fields]
+    return [model.from_db(queryset.db, attnames, row) for row in rows]
+
+
+@sync_to_async
+def aupdate_returning(queryset, values):
+    """
+    ``update_returning`` followed by ``send_post_save`` for every row, for async
+    views. Both run in the sync thread, like Django's own async queryset
+    methods, so that signal receivers may use the ORM.
+    """
+    instances = update_returning(queryset, values)
+    for instance in instances:
+        send_post_save(instance, values)
+    return instances
+
+
+def send_post_save(instance, update_fields):
+    """
+    ``QuerySet.update()`` does not send model signals. Send ``post_save`` for a
+    row written by ``update_returning`` so that receivers (cache invalidation,
+    ...) see the change like for ``Model.save(update_fields=...)``.
+    """
+    signals.post_save.send(
+        sender=type(instance),
+        instance=instance,
+        created=False,
+        update_fields=frozenset(update_fields),
+        raw=False,
+        using=instance._state.db,
+    )
+
+
+def save_file(model, field_name, content):
+    """
+    Store an uploaded file the way ``FileField.pre_save`` would and return the
+    name to write in the column.
+    """
+    field = model._meta.get_field(field_name)
+    name = field.generate_filename(None, content.name)
+    return field.storage.save(name, content, max_length=field.max_length)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by primary key.
+
+    Every page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n``, so the
+    database seeks on the primary key index instead of scanning an OFFSET.
+    Cursors are opaque base64 tokens returned in the ``next``/``previous`` links.
+    """
+    ordering = 'id'
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+
+
+def ordering_fields(paginator):
+    """
+    Names of the fields ``paginator`` orders by, which it reads from every row
+    """
+    ordering = getattr(paginator, 'ordering', None) or ()
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    return [name.lstrip('-') for name in ordering]
+
+
+class VersionedPaginationMixin:
+    """
+    Disable pagination for API versions listed in ``UNPAGINATED_API_VERSIONS``.
+
+    This keeps the original unpaginated list responses available for clients
+    which have not migrated to cursor pagination yet.
+    """
+
+    @property
+    def paginator(self):
+        if self.request.version in getattr(settings, 'UNPAGINATED_API_VERSIONS', ()):
+            return None
+        return super().paginator
+
+
+class SearchPagination(LimitOffsetPagination):
+    """
+    ``limit``/``offset`` pages of search results, which are ordered by rank
+    rather than by a key a cursor could seek on
+    """
+    default_limit = getattr(settings, 'API_PAGE_SIZE', 100)
+    max_limit = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
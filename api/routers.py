@@ -0,0 +1,153 @@
+"""
+Read replica routing.
+
+``ReplicaRouter`` sends reads of the ``REPLICA_APPS`` models to the aliases in
+``DATABASE_REPLICAS``, picked round-robin or by the fewest queries in flight
+(``DATABASE_REPLICA_STRATEGY``). Writes, reads inside a transaction and the
+reads of requests with unsafe methods or which wrote go to the primary.
+
+Replicas lag behind the primary, so ``ReplicaStickinessMiddleware`` also pins
+a client to the primary for ``REPLICA_STICKY_SECONDS`` after its own write,
+with the ``REPLICA_STICKY_COOKIE`` cookie or an ``X-Read-Primary`` header
+sent by clients which do not keep cookies.
+"""
+import contextvars
+import itertools
+import threading
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_HEADER = 'HTTP_X_READ_PRIMARY'
+
+_request = contextvars.ContextVar('replica_request', default=None)
+_round_robin = itertools.count()
+_load_lock = threading.Lock()
+_load = defaultdict(int)
+
+
+class RequestState:
+    """
+    Whether the current request reads from the primary, and whether it wrote
+    """
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def track_load(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` counting the queries in flight on each replica
+    """
+    alias = context['connection'].alias
+    with _load_lock:
+        _load[alias] += 1
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        with _load_lock:
+            _load[alias] -= 1
+
+
+def install_load_tracker(sender, connection, **kwargs):
+    if connection.alias in settings.DATABASE_REPLICAS and track_load not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_load)
+
+
+def choose_replica(replicas):
+    if settings.DATABASE_REPLICA_STRATEGY == 'least_loaded':
+        # start from the next round-robin replica so that ties are spread too
+        offset = next(_round_robin)
+        ordered = replicas[offset % len(replicas):] + replicas[:offset % len(replicas)]
+        return min(ordered, key=lambda alias: _load[alias])
+    return replicas[next(_round_robin) % len(replicas)]
+
+
+def routed(model):
+    return model._meta.app_label in settings.REPLICA_APPS
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not routed(model):
+            return None
+        state = _request.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return choose_replica(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None and routed(model):
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read from the primary for writes and for requests carrying the sticky cookie
+    or header, and set the cookie on responses to requests which wrote.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self.finish(response, state)
+
+    @staticmethod
+    def start(request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+            or bool(request.META.get(STICKY_HEADER))
+        )
+        state = RequestState(pinned)
+        return state, _request.set(state)
+
+    @staticmethod
+    def finish(response, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,149 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is done once
+by ``python manage.py generate_schema`` and served as a file. The artifact is
+tied to a hash of the project's source files; when they change and the artifact
+was not regenerated, the schema is built once per process and kept in
+memory instead. drf_yasg is only imported when a schema is actually built or
+the Swagger UI is opened.
+"""
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+FORMATS = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+TEST_MODULES = ('tests.py',)
+
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+def source_files():
+    """
+    Every Python module of the project's own apps except the tests: the schema
+    depends on URLconfs and views as much as on the filters, paginators and
+    mixins they import, and on the settings module.
+    """
+    for app_config in sorted(apps.get_app_configs(), key=lambda config: config.name):
+        if not app_config.path.startswith(settings.BASE_DIR):
+            continue
+        for root, dirs, files in os.walk(app_config.path):
+            dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py') and name not in TEST_MODULES:
+                    yield os.path.join(root, name)
+
+
+@lru_cache(maxsize=None)
+def code_hash():
+    """
+    Hash of the project's source files and of the settings that change the
+    generated schema.
+    """
+    md5 = hashlib.md5()
+    for path in source_files():
+        with open(path, 'rb') as f:
+            md5.update(os.path.relpath(path, settings.BASE_DIR).encode())
+            md5.update(f.read())
+    md5.update(settings.ROOT_URLCONF.encode())
+    md5.update(repr(sorted(settings.REST_FRAMEWORK.items())).encode())
+    md5.update(repr(sorted(settings.SWAGGER_SETTINGS.items())).encode())
+    return md5.hexdigest()
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Tees API",
+        default_version='v1',
+        description="Tees Backend",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@snippets.local"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def build_schema(fmt):
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(get_info()).get_schema(request=None, public=True)
+    codec = OpenAPICodecJson if fmt == 'json' else OpenAPICodecYaml
+    return codec(validators=[]).encode(schema)
+
+
+def artifact_path(fmt):
+    return os.path.join(settings.API_SCHEMA_DIR, 'openapi.{}'.format(fmt))
+
+
+def hash_path():
+    return os.path.join(settings.API_SCHEMA_DIR, 'openapi.hash')
+
+
+def write_artifacts():
+    os.makedirs(settings.API_SCHEMA_DIR, exist_ok=True)
+    for fmt in FORMATS:
+        with open(artifact_path(fmt), 'wb') as f:
+            f.write(build_schema(fmt))
+    with open(hash_path(), 'w') as f:
+        f.write(code_hash())
+
+
+def read_artifact(fmt):
+    try:
+        with open(hash_path()) as f:
+            if f.read().strip() != code_hash():
+                return None
+        with open(artifact_path(fmt), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def get_schema(fmt):
+    """
+    Return the encoded schema: from memory, from the build artifact when it
+    matches the current code, or freshly generated as a last resort.
+    """
+    key = (fmt, code_hash())
+    with _memory_lock:
+        if key not in _memory:
+            _memory[key] = read_artifact(fmt) or build_schema(fmt)
+        return _memory[key]
+
+
+def schema_view(request, fmt):
+    etag = '"{}-{}"'.format(code_hash()[:16], fmt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_schema(fmt), content_type=FORMATS[fmt])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@lru_cache(maxsize=None)
+def get_swagger_ui_view():
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    view = get_schema_view(get_info(), public=True, permission_classes=(permissions.AllowAny,))
+    return view.with_ui('swagger', cache_timeout=0)
+
+
+def swagger_ui(request, *args, **kwargs):
+    """
+    Swagger UI; the page itself is cheap, the schema it loads is ``SPEC_URL``.
+    """
+    return get_swagger_ui_view()(request, *args, **kwargs)
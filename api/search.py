@@ -0,0 +1,116 @@
+"""
+Full-text search over shirts and users.
+
+``SearchFilter`` narrows a view's queryset to the rows matching ``?q=`` and
+orders them by relevance, through the engine named by ``SEARCH_ENGINE``. All
+the terms of the query must match; the last one matches as a prefix, so that
+results follow the user's typing.
+
+``FTS5Engine`` joins the model's table to its SQLite FTS5 index,
+``<db_table>_search``, ranked with bm25. The indexes are external content
+tables (they store no copy of the rows) created by the app migrations, whose
+triggers update them in the same statement as every insert, update and delete,
+bulk writes included. ``IcontainsEngine`` scans the columns with
+``icontains``; FTS5 falls back to it on other database backends.
+"""
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+TERM = re.compile(r'\w+')
+
+
+class SearchEngine(ABC):
+    """
+    Base class of the ``SEARCH_ENGINE`` backends
+    """
+
+    @abstractmethod
+    def search(self, queryset, terms, fields):
+        """
+        Return ``queryset`` narrowed to the rows whose ``fields`` contain every
+        term, the last one as a prefix, best matches first.
+        """
+
+
+class IcontainsEngine(SearchEngine):
+    """
+    ``icontains`` scan of the fields, in primary key order. Matches inside words
+    too, and needs no index.
+    """
+
+    def search(self, queryset, terms, fields):
+        for term in terms:
+            match = Q()
+            for field in fields:
+                match |= Q(**{field + '__icontains': term})
+            queryset = queryset.filter(match)
+        return queryset.order_by('pk')
+
+
+class FTS5Engine(SearchEngine):
+    """
+    Queries on the ``<db_table>_search`` FTS5 index of the model, ranked with
+    bm25. Ranking computes the score of every match, so queries matching more
+    than ``SEARCH_RANK_LIMIT`` rows are returned in primary key order instead.
+    """
+    fallback = IcontainsEngine()
+
+    def search(self, queryset, terms, fields):
+        connection = connections[queryset.db]
+        if connection.vendor != 'sqlite':
+            return self.fallback.search(queryset, terms, fields)
+
+        quote = connection.ops.quote_name
+        opts = queryset.model._meta
+        index = quote(opts.db_table + '_search')
+        # terms are \w+ so they never contain quotes or FTS5 operators. Only the last
+        # one is a prefix: expanding a prefix merges the postings of every term it
+        # covers, which is costly for the complete, often frequent, words before it.
+        phrases = ['"{}"'.format(term) for term in terms[:-1]] + ['"{}"*'.format(terms[-1])]
+        match = '{{{}}} : ({})'.format(' '.join(fields), ' '.join(phrases))
+        # the bounded count is evaluated once per query, and rank only when it is small
+        rank = ('CASE WHEN (SELECT COUNT(*) FROM (SELECT 1 FROM {0} WHERE {0} MATCH %s LIMIT %s)) > %s '
+                'THEN {0}.rowid ELSE {0}.rank END').format(index)
+        return queryset.extra(
+            tables=[opts.db_table + '_search'],
+            where=['{}.rowid = {}.{}'.format(index, quote(opts.db_table), quote(opts.pk.column)),
+                   '{} MATCH %s'.format(index)],
+            params=[match],
+            select={'search_rank': rank},
+            select_params=[match, settings.SEARCH_RANK_LIMIT + 1, settings.SEARCH_RANK_LIMIT],
+            order_by=['search_rank'],
+        )
+
+
+@lru_cache(maxsize=None)
+def load_engine(path):
+    return import_string(path)()
+
+
+def get_engine():
+    return load_engine(settings.SEARCH_ENGINE)
+
+
+class SearchFilter(BaseFilterBackend):
+    """
+    Full-text search of the view's ``search_fields`` with ``?q=``
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = TERM.findall(request.query_params.get(self.search_param, ''))
+        if not terms:
+            raise ValidationError({self.search_param: ["A search query is required."]})
+        if len(terms) > settings.SEARCH_MAX_TERMS:
+            raise ValidationError({
+                self.search_param: ["At most {} search terms are allowed".format(settings.SEARCH_MAX_TERMS)]
+            })
+        return get_engine().search(queryset, terms, view.search_fields)
@@ -19,12 +19,13 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/3.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'k_&#^)6j8#53rmofd99)n_sp=6r5ciu4-g6or-bgjs8=ur&e%@'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'k_&#^)6j8#53rmofd99)n_sp=6r5ciu4-g6or-bgjs8=ur&e%@')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# With DEBUG on, Django also keeps every executed SQL query in memory.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 
@@ -36,12 +37,17 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',
     'drf_yasg',
+    'api',
     'user',
     'shirt',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.routers.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +57,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'api.urls'
+# api.async_urls serves the user and shirt endpoints with async views (set by api/asgi.py)
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'api.urls')
 
 TEMPLATES = [
     {
@@ -77,11 +84,71 @@ AUTH_USER_MODEL = "user.User"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # django.db.backends.sqlite3 with WAL, tuned pragmas and BEGIN IMMEDIATE,
+        # see api/backends/sqlite3/base.py
+        'ENGINE': 'api.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # keep connections open between requests instead of reconnecting every time
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas, e.g. DJANGO_DB_REPLICAS=/data/replica1.sqlite3,/data/replica2.sqlite3.
+# Reads of REPLICA_APPS models are spread over them ('round_robin' or 'least_loaded');
+# writes, transactions and clients which wrote in the last REPLICA_STICKY_SECONDS
+# use the primary. Tests mirror the replicas to the default database.
+DATABASE_REPLICAS = []
+for index, name in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), 1):
+    DATABASES['replica{}'.format(index)] = dict(DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append('replica{}'.format(index))
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+DATABASE_REPLICA_STRATEGY = os.environ.get('DJANGO_DB_REPLICA_STRATEGY', 'round_robin')
+REPLICA_APPS = ('shirt', 'user')
+REPLICA_STICKY_COOKIE = 'read_primary'
+REPLICA_STICKY_SECONDS = 5
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# Local memory is private to each process: a server running several worker
+# processes must share a cache, or a write handled by one worker leaves the
+# others serving stale details. DJANGO_CACHE_DIR switches to a file-based cache
+# in that directory (gunicorn.conf.py sets it for multi-worker servers).
+CACHE_DIR = os.environ.get('DJANGO_CACHE_DIR')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 100000))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Serialized shirt and user details are cached in this cache alias; point it to a
+# shared backend (file-based, memcached, redis, ...) to share entries between workers.
+DETAIL_CACHE_ALIAS = 'default'
+DETAIL_CACHE_TIMEOUT = 300
+
+# Background tasks run in an in-process thread pool; use 'api.tasks.ImmediateBackend'
+# to run them synchronously.
+TASK_QUEUE_BACKEND = 'api.tasks.ThreadPoolBackend'
+TASK_QUEUE_WORKERS = 2
+
+# Thumbnails generated in the background for every uploaded profile picture.
+PROFILE_PICTURE_SIZES = (64, 256, 1024)
+PROFILE_PICTURE_FORMATS = ('webp', 'jpeg')
+PROFILE_PICTURE_QUALITY = 85
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -102,20 +169,92 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'api.negotiation.VersionedContentNegotiation',
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'DEFAULT_VERSION': 'v1',
+    'ALLOWED_VERSIONS': ('v1', 'v2'),
 }
 
+# API versions answered with MessagePack (application/msgpack) unless the client's
+# Accept header asks for a specific media type such as application/json.
+COMPACT_API_VERSIONS = ('v2',)
+
+# Responses of compressible media types and at least COMPRESSION_MIN_SIZE bytes are
+# compressed with the first of COMPRESSION_ENCODINGS the client accepts. 'zstd' and
+# 'br' need the zstandard and brotli packages and are skipped without them.
+COMPRESSION_ENCODINGS = ('zstd', 'br', 'gzip')
+COMPRESSION_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+COMPRESSION_MIN_SIZE = 1024
+
+# Cursor pagination for list endpoints. Versions listed in UNPAGINATED_API_VERSIONS
+# keep returning the whole collection as a plain JSON array for backward compatibility.
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+UNPAGINATED_API_VERSIONS = ('v1',)
+
+# Number of rows fetched per database round trip by the NDJSON export endpoints.
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk write endpoints: maximum number of items accepted per request and number
+# of rows written per INSERT/UPDATE statement.
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+
+# Full-text search (?q=) of the shirt and user search endpoints. 'api.search.FTS5Engine'
+# uses the SQLite FTS5 indexes kept in sync by triggers (other backends fall back to
+# icontains); 'api.search.IcontainsEngine' scans the columns.
+SEARCH_ENGINE = 'api.search.FTS5Engine'
+SEARCH_MAX_TERMS = 10
+# Queries matching more rows than this are not ranked but ordered by id.
+SEARCH_RANK_LIMIT = 10000
+
+# Batch retrieval endpoints (?ids=1,5,9): maximum number of ids per request.
+BATCH_MAX_IDS = 100
+
+# Per-route request metrics served at /metrics. Only METRICS_SAMPLE_RATE of the
+# requests (0 to 1) record latency, queries, sizes and serializer time; every
+# request is counted. /metrics requires the bearer METRICS_AUTH_TOKEN when it is
+# set, and otherwise only answers clients in METRICS_ALLOWED_IPS.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.01))
+METRICS_SERVER_TIMING = True
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+# Passwords are hashed on a pool of this many threads (None: one per CPU).
+PASSWORD_HASH_WORKERS = None
+
+# Users authenticated by JWT are kept in a per-process cache for this many seconds
+# (0 disables it). Changes made through other processes show up after the TTL.
+JWT_USER_CACHE_TTL = 30
+JWT_USER_CACHE_SIZE = 10000
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(weeks=1),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'user.tokens.TokenRefreshSerializer',
 }
 
+# Refresh tokens are checked against an in-process Bloom filter of the blacklist,
+# synced from the database every TOKEN_BLACKLIST_SYNC_INTERVAL seconds. Expired
+# tokens are deleted in the background at most every TOKEN_BLACKLIST_PRUNE_INTERVAL.
+TOKEN_BLACKLIST_FILTER_CAPACITY = 1000000
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5
+TOKEN_BLACKLIST_PRUNE_INTERVAL = 3600
+TOKEN_BLACKLIST_PRUNE_BATCH_SIZE = 1000
+
 SWAGGER_SETTINGS = {
    'SECURITY_DEFINITIONS': {
       'Basic': {
@@ -126,9 +265,14 @@ SWAGGER_SETTINGS = {
             'name': 'Authorization',
             'in': 'header'
       }
-   }
+   },
+   # the UI loads the precomputed schema instead of regenerating it
+   'SPEC_URL': '/swagger.json',
 }
 
+# Build-time OpenAPI schema artifacts (``python manage.py generate_schema``)
+API_SCHEMA_DIR = os.path.join(BASE_DIR, 'schema')
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -138,14 +282,32 @@ TIME_ZONE = 'UTC'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/pictures/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'pictures')
+
+STORAGES = {
+    # Uploaded files get a content hash in their name, so that they can be cached forever.
+    'default': {
+        'BACKEND': 'api.storage.ContentHashedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Browser cache lifetime of media files without a content hash in their name.
+MEDIA_CACHE_MAX_AGE = 3600
+
+# Hand media transfers to the front-end server: None, 'x-accel-redirect' (nginx) or
+# 'x-sendfile' (Apache, lighttpd). For nginx, MEDIA_ACCEL_REDIRECT_PREFIX must be an
+# internal location aliased to MEDIA_ROOT.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
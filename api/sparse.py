@@ -0,0 +1,90 @@
+"""
+Sparse fieldsets: ``?fields=id,username`` limits a response to the listed
+fields and the query to their columns.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import exceptions
+
+from api.pagination import ordering_fields
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer taking a ``fields`` argument: the names of the fields to keep
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def model_columns(serializer):
+    """
+    Column names of the model fields behind ``serializer``'s readable fields, or
+    ``None`` when a field does not map to a single column.
+    """
+    model = serializer.Meta.model
+    columns = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        columns.append(model_field.attname)
+    return columns
+
+
+class SparseFieldsMixin:
+    """
+    Restrict GET responses to the serializer fields named in the ``fields``
+    query parameter, and select only their columns. Without the parameter the
+    serializer's fields are the projection, so unused columns are never read.
+    """
+    fields_query_param = 'fields'
+
+    def get_sparse_fields(self):
+        """
+        The requested field names, or ``None`` for all of them
+        """
+        if not hasattr(self, '_sparse_fields'):
+            value = self.request.query_params.get(self.fields_query_param, '')
+            fields = [name.strip() for name in value.split(',') if name.strip()] or None
+            if fields is not None:
+                readable = [name for name, field in self.get_serializer_class()().fields.items()
+                            if not field.write_only]
+                unknown = [name for name in fields if name not in readable]
+                if unknown:
+                    raise exceptions.ValidationError({self.fields_query_param: [
+                        'Unknown field(s): {}. Choose from: {}.'.format(', '.join(unknown), ', '.join(readable))
+                    ]})
+            self._sparse_fields = fields
+        return self._sparse_fields
+
+    def is_read(self):
+        # schema generators instantiate views without a request
+        return getattr(self.request, 'method', None) in ('GET', 'HEAD')
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_read():
+            kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # writes keep whole rows: saving an instance with deferred fields skips them, auto_now included
+        if not self.is_read():
+            return queryset
+        columns = model_columns(self.get_serializer())
+        if not columns:
+            return queryset
+        # the cursor paginator reads its ordering fields even when they are not listed
+        columns += [name for name in ordering_fields(self.paginator) if name not in columns]
+        return queryset.only(*columns)
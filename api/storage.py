@@ -0,0 +1,42 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}(\.[^./]+)?$' % HASH_LENGTH)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class ContentHashedStorage(FileSystemStorage):
+    """
+    File system storage which embeds a hash of the content in every file name,
+    e.g. ``profile-pictures/me.0123456789ab.jpg``.
+
+    A name therefore never points to different bytes over time, which lets the
+    media view mark these files as immutable for browsers and CDNs. Saving
+    content which is already stored returns the existing name.
+    """
+
+    def hashed_name(self, name, content):
+        md5 = hashlib.md5()
+        for chunk in content.chunks():
+            md5.update(chunk)
+        content.seek(0)
+        root, ext = os.path.splitext(name)
+        return '{}.{}{}'.format(root, md5.hexdigest()[:HASH_LENGTH], ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name.replace('\\', '/')
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,87 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class ImmediateBackend:
+    """
+    Run tasks synchronously in the calling thread. Useful for tests and scripts.
+    """
+
+    def submit(self, func, *args, **kwargs):
+        run_task(func, *args, **kwargs)
+
+
+class ThreadPoolBackend:
+    """
+    Run tasks in a bounded pool of worker threads inside the current process.
+    No broker or external service is needed; queued tasks are lost when the
+    process exits.
+    """
+
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.TASK_QUEUE_WORKERS,
+            thread_name_prefix='tasks'
+        )
+
+    def submit(self, func, *args, **kwargs):
+        return self.executor.submit(self.run, func, *args, **kwargs)
+
+    @staticmethod
+    def run(func, *args, **kwargs):
+        try:
+            run_task(func, *args, **kwargs)
+        finally:
+            # database connections are per thread; do not leak the worker's ones
+            connections.close_all()
+
+
+def run_task(func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Task %s failed", getattr(func, '__qualname__', func))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.TASK_QUEUE_BACKEND)()
+        return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting.startswith('TASK_QUEUE_'):
+        _backend = None
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` on the configured ``TASK_QUEUE_BACKEND``.
+    """
+    get_backend().submit(func, *args, **kwargs)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """
+    Enqueue ``func`` once the current transaction commits, so that the task sees
+    the rows written by the request.
+    """
+    transaction.on_commit(partial(enqueue, func, *args, **kwargs))
@@ -0,0 +1,475 @@
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import msgpack
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.views import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from api import schema
+from api.backends.sqlite3.base import DatabaseWrapper
+from api import compression, routers
+from api.bloom import BloomFilter
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+from api.metrics import registry
+from shirt.models import Shirt
+from user.models import User
+
+
+def read_streaming(response):
+    """
+    Chunks of a streaming response, whether its content is a sync or an async
+    iterator (async views under the test client)
+    """
+    if response.is_async:
+        async def collect():
+            return [chunk async for chunk in response.streaming_content]
+        return async_to_sync(collect)()
+    return list(response.streaming_content)
+
+
+class SchemaTest(APITestCase):
+
+    def setUp(self):
+        self.schema_dir = tempfile.mkdtemp()
+        self.override = override_settings(API_SCHEMA_DIR=self.schema_dir)
+        self.override.enable()
+        schema._memory.clear()
+
+    def tearDown(self):
+        self.override.disable()
+        schema._memory.clear()
+
+    def test_generate_schema_writes_artifacts(self):
+        call_command('generate_schema', stdout=open(os.devnull, 'w'))
+        with open(os.path.join(self.schema_dir, 'openapi.json')) as f:
+            paths = json.load(f)['paths']
+        self.assertIn('/api/{version}/shirt/', paths)
+        with open(os.path.join(self.schema_dir, 'openapi.hash')) as f:
+            self.assertEqual(f.read(), schema.code_hash())
+
+    def test_code_hash_covers_imported_modules(self):
+        """
+        This test ensures that the schema hash covers every module the
+        generator imports, not only the URLconfs, views and serializers
+        """
+        files = {os.path.relpath(path, settings.BASE_DIR) for path in schema.source_files()}
+        for path in ['api/async_urls.py', 'api/pagination.py', 'api/settings.py', 'api/sparse.py',
+                     'shirt/filters.py', 'user/async_views.py']:
+            self.assertIn(path, files)
+        self.assertNotIn('api/tests.py', files)
+
+    def test_serves_artifact_without_regenerating(self):
+        os.makedirs(self.schema_dir, exist_ok=True)
+        with open(os.path.join(self.schema_dir, 'openapi.json'), 'wb') as f:
+            f.write(b'{"artifact": true}')
+        with open(os.path.join(self.schema_dir, 'openapi.hash'), 'w') as f:
+            f.write(schema.code_hash())
+
+        response = self.client.get(reverse('schema-file', kwargs={'fmt': 'json'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'{"artifact": true}')
+
+    def test_stale_artifact_is_ignored(self):
+        os.makedirs(self.schema_dir, exist_ok=True)
+        with open(os.path.join(self.schema_dir, 'openapi.json'), 'wb') as f:
+            f.write(b'{"artifact": true}')
+        with open(os.path.join(self.schema_dir, 'openapi.hash'), 'w') as f:
+            f.write('stale')
+
+        response = self.client.get(reverse('schema-file', kwargs={'fmt': 'json'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/api/{version}/users/list', json.loads(response.content)['paths'])
+
+    def test_conditional_request(self):
+        url = reverse('schema-file', kwargs={'fmt': 'yaml'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/yaml')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_urlconf_does_not_import_drf_yasg(self):
+        code = (
+            'import sys, django; django.setup(); import api.urls; '
+            'print(any(name.startswith("drf_yasg.") for name in sys.modules))'
+        )
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='api.settings'),
+        )
+        self.assertEqual(output.strip(), b'False')
+
+
+class BloomFilterTest(APITestCase):
+
+    def test_membership(self):
+        """
+        This test ensures that added items are always found and that
+        false positives stay close to the configured rate
+        """
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add('member-{}'.format(i))
+        self.assertTrue(all('member-{}'.format(i) in bloom for i in range(1000)))
+        false_positives = sum('other-{}'.format(i) in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class AsyncUrlconfTest(APITestCase):
+
+    def test_async_urlconf_serves_coroutines(self):
+        """
+        This test ensures that the async URLconf routes the user and shirt
+        endpoints to coroutine views, and keeps the other routes
+        """
+        for name, kwargs in (("create-list-shirt", {"version": "v1"}),
+                             ("details-update-delete-shirt", {"version": "v1", "pk": 1}),
+                             ("user-register", {"version": "v1"}),
+                             ("user-update", {"version": "v1", "pk": 1})):
+            match = resolve(reverse(name, kwargs=kwargs), urlconf='api.async_urls')
+            self.assertTrue(asyncio.iscoroutinefunction(match.func), name)
+            self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse(name, kwargs=kwargs), urlconf='api.urls').func), name)
+        self.assertEqual(resolve('/api/token/', urlconf='api.async_urls').url_name, 'token_obtain_pair')
+
+    @override_settings(ROOT_URLCONF='api.async_urls', EXPORT_CHUNK_SIZE=1, MEDIA_ROOT=tempfile.mkdtemp())
+    def test_async_urlconf_streams_from_async_iterators(self):
+        """
+        This test ensures that exports and files are streamed from async
+        iterators under the async URLconf, which ASGI sends chunk by chunk
+        instead of collecting a synchronous iterator first
+        """
+        for username in ("stream1", "stream2"):
+            User.objects.create_user(username=username, password="stream_password")
+        response = self.client.get(reverse("user-export", kwargs={"version": "v1"}))
+        self.assertTrue(response.is_async)
+        chunks = read_streaming(response)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([json.loads(chunk)["username"] for chunk in chunks], ["stream1", "stream2"])
+
+        content = os.urandom(200 * 1024)
+        with open(os.path.join(settings.MEDIA_ROOT, "blob.bin"), "wb") as f:
+            f.write(content)
+        response = self.client.get(reverse("media", kwargs={"path": "blob.bin"}))
+        self.assertTrue(response.is_async)
+        self.assertEqual(response["Content-Length"], str(len(content)))
+        chunks = read_streaming(response)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), content)
+
+        response = self.client.get(reverse("media", kwargs={"path": "blob.bin"}), HTTP_RANGE="bytes=10-19")
+        self.assertEqual(b"".join(read_streaming(response)), content[10:20])
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class MetricsTest(APITestCase):
+
+    def setUp(self):
+        registry.reset()
+        User.objects.create_user(username='metrics', password='metrics_password')
+
+    def test_metrics_per_route(self):
+        """
+        This test ensures that requests are recorded per named route and
+        exposed in the Prometheus text format
+        """
+        response = self.client.get(reverse("user-list", kwargs={"version": "v1"}))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries", ser;dur=')
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('api_requests_total{route="user-list",method="GET",status="200"} 1', body)
+        self.assertIn('api_request_duration_seconds_count{route="user-list",method="GET"} 1', body)
+        self.assertIn('api_db_queries_bucket{route="user-list",method="GET",le="0"} 0', body)
+        self.assertIn('api_serializer_duration_seconds_count{route="user-list",method="GET"} 1', body)
+        self.assertIn('api_response_size_bytes_count{route="user-list",method="GET"} 1', body)
+
+    def test_unsampled_requests_are_counted(self):
+        """
+        This test ensures that requests outside the sample are only counted
+        """
+        with override_settings(METRICS_SAMPLE_RATE=0):
+            response = self.client.get(reverse("user-list", kwargs={"version": "v1"}))
+            self.assertNotIn('Server-Timing', response)
+            body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('api_requests_total{route="user-list",method="GET",status="200"} 1', body)
+        self.assertNotIn('api_request_duration_seconds_count{route="user-list"', body)
+
+    @override_settings(METRICS_AUTH_TOKEN='scrape')
+    def test_metrics_token(self):
+        """
+        This test ensures that a configured token is required to read metrics
+        """
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_allowed_ips(self):
+        """
+        This test ensures that without a token, metrics are only served to
+        the allowed client addresses
+        """
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncMetricsTest(MetricsTest):
+    pass
+
+
+class SQLiteBackendTest(SimpleTestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+
+    def connect(self, **options):
+        wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=self.path, OPTIONS=options), 'sqlite-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """
+        This test ensures that new connections run the tuned pragmas and
+        that OPTIONS can override them
+        """
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64 * 1024)
+
+        wrapper = self.connect(pragmas={'busy_timeout': 100, 'cache_size': None})
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 100)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2000)
+
+    def test_transactions_take_the_write_lock(self):
+        """
+        This test ensures that a transaction holds the write lock from
+        its start, so other writers wait instead of failing mid-transaction
+        """
+        writer = self.connect()
+        writer.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        self.addCleanup(writer.rollback)
+
+        other = self.connect(pragmas={'busy_timeout': 0})
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            other.cursor().execute('BEGIN IMMEDIATE')
+
+    def test_invalid_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.connect(transaction_mode='LAZY').cursor()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DATABASE_REPLICA_STRATEGY='round_robin')
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def request(self, method='get', **extra):
+        """
+        Run a request through the middleware; the view reads a shirt, then
+        writes one for POST. Return where the reads went and the response.
+        """
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Shirt))
+            if request.method == 'POST':
+                self.router.db_for_write(Shirt)
+                reads.append(self.router.db_for_read(Shirt))
+            return HttpResponse()
+
+        response = routers.ReplicaStickinessMiddleware(view)(getattr(RequestFactory(), method)('/', **extra))
+        return reads, response
+
+    def test_reads_are_spread_over_replicas(self):
+        """
+        This test ensures that reads of the routed apps alternate between
+        the replicas while other apps and writes use the primary
+        """
+        reads = {self.router.db_for_read(Shirt), self.router.db_for_read(User)}
+        self.assertEqual(reads, {'replica1', 'replica2'})
+        self.assertIsNone(self.router.db_for_read(BlacklistedToken))
+        self.assertEqual(self.router.db_for_write(Shirt), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'shirt'))
+
+    @override_settings(DATABASE_REPLICA_STRATEGY='least_loaded')
+    def test_least_loaded(self):
+        with mock.patch.dict(routers._load, {'replica1': 3, 'replica2': 1}):
+            self.assertEqual({self.router.db_for_read(Shirt) for _ in range(4)}, {'replica2'})
+
+    def test_reads_in_transactions_use_primary(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Shirt), 'default')
+
+    def test_read_your_writes(self):
+        """
+        This test ensures that a request which wrote reads from the primary
+        afterwards, and that its client stays on the primary for a while
+        """
+        reads, response = self.request()
+        self.assertNotEqual(reads, ['default'])
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+        reads, response = self.request('post')
+        self.assertEqual(reads, ['default', 'default'])
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        self.assertEqual(self.request(HTTP_COOKIE='{}=1'.format(settings.REPLICA_STICKY_COOKIE))[0], ['default'])
+        self.assertEqual(self.request(HTTP_X_READ_PRIMARY='1')[0], ['default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Shirt))
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, self.request('post')[1].cookies)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+
+    def test_same_bytes_as_json_renderer(self):
+        """
+        This test ensures that the orjson renderer output matches DRF's
+        JSONRenderer, including the fallbacks
+        """
+        samples = [
+            [{"id": 1, "name": "caf\u00e9 \u2028\u2029 \U0001f455", "ok": True, "none": None, "nested": {"a": []}}],
+            {"next": "http://testserver/?cursor=cD0x", "results": [], "big": 2 ** 70},
+            {"user": User(username="not json")},
+        ]
+        for data in samples[:2]:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render(samples[2])
+        self.assertEqual(FastJSONRenderer().render(samples[0], 'application/json; indent=4'),
+                         JSONRenderer().render(samples[0], 'application/json; indent=4'))
+
+
+class CompressionTest(APITestCase):
+
+    def setUp(self):
+        User.objects.bulk_create([User(username="compressed{}".format(i), password="!") for i in range(50)])
+        self.url = reverse("user-list", kwargs={"version": "v1"})
+
+    def test_gzip(self):
+        """
+        This test ensures that large responses are gzipped for clients which
+        accept it, with a weak ETag that still answers 304
+        """
+        plain = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(reverse("user-details", kwargs={"version": "v1", "pk": 1}),
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_streaming(self):
+        """
+        This test ensures that streaming responses stay streamed, each chunk
+        being flushed by the compressor
+        """
+        url = reverse("user-export", kwargs={"version": "v1"})
+        plain = b"".join(read_streaming(self.client.get(url)))
+        with override_settings(EXPORT_CHUNK_SIZE=10):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            chunks = read_streaming(response)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(gzip.decompress(b"".join(chunks)), plain)
+
+    def test_negotiate(self):
+        """
+        This test ensures that the client's q-values and then the server's
+        preference order pick the encoding
+        """
+        with override_settings(COMPRESSION_ENCODINGS=("zstd", "br", "gzip")), \
+                mock.patch.dict(compression.CODECS, {"br": compression.Brotli, "zstd": compression.Zstd}):
+            self.assertEqual(compression.negotiate("gzip, br, zstd"), "zstd")
+            self.assertEqual(compression.negotiate("gzip, br;q=0.9, zstd;q=0.5"), "gzip")
+            self.assertEqual(compression.negotiate("br, zstd;q=0"), "br")
+            self.assertEqual(compression.negotiate("*;q=0.1, gzip;q=0"), "zstd")
+            self.assertIsNone(compression.negotiate("identity"))
+            self.assertIsNone(compression.negotiate(""))
+        with mock.patch.dict(compression.CODECS, clear=True):
+            compression.CODECS["gzip"] = compression.Gzip
+            self.assertEqual(compression.negotiate("zstd, br, gzip;q=0.5"), "gzip")
+
+    @unittest.skipUnless(compression.brotli and compression.zstandard, "brotli and zstandard are not installed")
+    def test_brotli_and_zstd(self):
+        plain = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br")
+        self.assertEqual(compression.brotli.decompress(response.content), plain)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="zstd")
+        self.assertEqual(compression.zstandard.ZstdDecompressor().decompress(response.content), plain)
+
+
+class MessagePackTest(APITestCase):
+
+    def setUp(self):
+        User.objects.create_user(username="packed", password="packed_password", first_name="\u00e9")
+
+    def test_v2_defaults_to_msgpack(self):
+        """
+        This test ensures that v2 answers in MessagePack unless JSON is asked
+        for, and that v1 keeps answering JSON
+        """
+        url = reverse("user-list", kwargs={"version": "v2"})
+        json_response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(json_response["Content-Type"], "application/json")
+
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_response.json())
+        self.assertEqual(self.client.get(url, data={"format": "json"})["Content-Type"], "application/json")
+
+        response = self.client.get(reverse("user-list", kwargs={"version": "v1"}))
+        self.assertEqual(response["Content-Type"], "application/json")
+        response = self.client.get(reverse("user-list", kwargs={"version": "v1"}), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_response.json())
+
+    def test_errors_and_dates(self):
+        response = self.client.post(reverse("token_obtain_pair"), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(msgpack.unpackb(response.content), {"username": ["This field is required."],
+                                                            "password": ["This field is required."]})
+        user = User.objects.get(username="packed")
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render({"joined": user.date_joined})),
+                         json.loads(JSONRenderer().render({"joined": user.date_joined})))
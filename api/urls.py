@@ -13,36 +13,36 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.conf import settings
-from django.conf.urls import url
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include, re_path
-from django.views.static import serve
-from drf_yasg import openapi
-from rest_framework import permissions
 from rest_framework_simplejwt import views as jwt_views
-from drf_yasg.views import get_schema_view
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Tees API",
-        default_version='v1',
-        description="Tees Backend",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+
+from api import media, schema
+from api.views import CacheStatsView, metrics
+
+
+
+def media_urlpatterns(serve):
+    return [
+        re_path(r'^media/(?P<path>.*)$', serve),
+        re_path(r'^{}(?P<path>.*)$'.format(re.escape(settings.MEDIA_URL.lstrip('/'))), serve, name='media'),
+        re_path(r'^{}(?P<path>.*)$'.format(re.escape(settings.STATIC_URL.lstrip('/'))), serve,
+                {'document_root': settings.STATIC_ROOT}),
+    ]
+
 
 urlpatterns = [
                   path('admin/', admin.site.urls),
                   re_path('api/(?P<version>(v1|v2))/users/', include('user.urls')),
                   re_path('api/(?P<version>(v1|v2))/shirt/', include('shirt.urls')),
-                  url(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT, }),
+              ] + media_urlpatterns(media.serve) + [
                   path('api/token/', jwt_views.TokenObtainPairView.as_view(), name='token_obtain_pair'),
                   path('api/token/refresh/', jwt_views.TokenRefreshView.as_view(), name='token_refresh'),
-                  url(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+                  path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+                  path('metrics', metrics, name='metrics'),
+                  re_path(r'^swagger\.(?P<fmt>json|yaml)$', schema.schema_view, name='schema-file'),
+                  re_path(r'^swagger/$', schema.swagger_ui, name='schema-swagger-ui'),
+              ]
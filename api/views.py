@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.cache import detail_cache
+from api.metrics import registry
+
+
+class CacheStatsView(APIView):
+    """
+    Hit and miss counters of the detail cache, per model
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(detail_cache.stats.snapshot())
+
+
+def metrics(request):
+    """
+    Request metrics in the Prometheus text format. When ``METRICS_AUTH_TOKEN`` is
+    set, scrapers must send it as ``Authorization: Bearer <token>``; otherwise
+    only clients in ``METRICS_ALLOWED_IPS`` are answered.
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    if token:
+        if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + token):
+            return HttpResponse(status=401)
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponse(status=403)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,50 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Every script runs against a throw-away SQLite database, created and migrated
+like the test runner does, so the development database is never touched.
+"""
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    directory = tempfile.mkdtemp()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(percent / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def summarize(name, seconds):
+    milliseconds = [value * 1000 for value in seconds]
+    print('{:<32} n={:<6} mean={:8.2f}ms p50={:8.2f}ms p99={:8.2f}ms'.format(
+        name,
+        len(milliseconds),
+        statistics.mean(milliseconds),
+        percentile(milliseconds, 50),
+        percentile(milliseconds, 99),
+    ))
@@ -0,0 +1,66 @@
+"""
+Bytes on the wire and CPU time per response of every response encoding:
+JSON and MessagePack, uncompressed and with each available compression.
+
+    python -m benchmarks.encodings --rows 1000 --repeat 20
+
+The payloads are a page of the shirt list and of the user list, as the list
+views produce them. CPU time covers rendering plus compression.
+"""
+import argparse
+import time
+
+from benchmarks.common import benchmark_database, setup
+
+
+def cpu_time(repeat, func, *args):
+    start = time.process_time()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.process_time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='rows per response')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.test import APIRequestFactory
+
+    from api.compression import CODECS, get_codec
+    from api.fast import RowSerializer
+    from api.renderers import FastJSONRenderer, MessagePackRenderer
+    from benchmarks.fixtures import seed_shirts, seed_users
+    from shirt.models import Shirt
+    from shirt.serializers import ShirtSerializer
+    from user.models import User
+    from user.serializers import UserWithoutPasswordSerializer
+
+    with benchmark_database():
+        seed_shirts(args.rows)
+        seed_users(args.rows)
+        context = {'request': APIRequestFactory().get('/')}
+        print('{:<8} {:<8} {:<6} {:>10} {:>8} {:>10}'.format('payload', 'format', 'coding', 'bytes', 'ratio', 'cpu ms'))
+
+        for name, queryset, serializer_class in (('shirts', Shirt.objects.order_by('pk'), ShirtSerializer),
+                                                 ('users', User.objects.order_by('pk'), UserWithoutPasswordSerializer)):
+            rows = RowSerializer.compile(serializer_class(context=context))
+            data = rows.to_dicts(queryset.values_list(*rows.columns))
+            baseline = None
+            for renderer in (FastJSONRenderer(), MessagePackRenderer()):
+                render_time, body = cpu_time(args.repeat, renderer.render, data)
+                baseline = baseline or len(body)
+                for coding in ('identity',) + tuple(sorted(CODECS)):
+                    if coding == 'identity':
+                        size, elapsed = len(body), render_time
+                    else:
+                        compress_time, compressed = cpu_time(args.repeat, get_codec(coding).compress, body)
+                        size, elapsed = len(compressed), render_time + compress_time
+                    print('{:<8} {:<8} {:<6} {:>10} {:>8.3f} {:>10.3f}'.format(
+                        name, renderer.format, coding, size, size / baseline, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Bulk fixture generator for the benchmarks.
+
+Rows are written with ``bulk_create`` in batches, and every user shares one
+precomputed password hash, so a million rows take seconds rather than hours.
+"""
+import random
+
+SIZES = range(1, 100)
+FIRST_NAMES = ('ada', 'alan', 'grace', 'linus', 'barbara', 'ken', 'margaret', 'dennis')
+
+
+def batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield start, min(batch_size, count - start)
+
+
+def seed_shirts(count, batch_size=10000, seed=0):
+    from shirt.models import Shirt
+
+    rng = random.Random(seed)
+    for start, size in batches(count, batch_size):
+        Shirt.objects.bulk_create([
+            Shirt(
+                name='shirt {:07d}'.format(start + i),
+                email='owner{}@example.com'.format(rng.randrange(max(count // 10, 1))),
+                size=rng.choice(SIZES),
+            )
+            for i in range(size)
+        ])
+
+
+def seed_users(count, password='bench-password', batch_size=10000, seed=0):
+    from django.contrib.auth.hashers import make_password
+
+    from user.models import User
+
+    rng = random.Random(seed)
+    password_hash = make_password(password)
+    for start, size in batches(count, batch_size):
+        User.objects.bulk_create([
+            User(
+                username='user{:07d}'.format(start + i),
+                password=password_hash,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name='bench',
+                email='user{}@example.com'.format(start + i),
+            )
+            for i in range(size)
+        ])
@@ -0,0 +1,68 @@
+"""
+Closed-loop HTTP load test against a running server.
+
+    python -m benchmarks.load_test http://localhost:8000/api/v1/users/list --concurrency 32 --duration 30
+
+Run it once against ``python manage.py runserver`` and once against
+``gunicorn api.wsgi`` to compare throughput. Pass ``--token`` to send a JWT
+access token for the endpoints which require authentication.
+"""
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import summarize
+
+
+def worker(url, headers, deadline, latencies, errors, lock):
+    local_latencies, local_errors = [], 0
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(url, headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            local_errors += 1
+            continue
+        local_latencies.append(time.perf_counter() - start)
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--token', help='JWT access token sent as a Bearer token')
+    args = parser.parse_args()
+
+    headers = {'Accept': 'application/json'}
+    if args.token:
+        headers['Authorization'] = 'Bearer ' + args.token
+
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args.url, headers, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print('{} requests in {:.1f}s, {} errors, {:.1f} req/s'.format(
+        len(latencies), elapsed, sum(errors), len(latencies) / elapsed))
+    if latencies:
+        summarize(args.url, latencies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare the latency of a registration with a profile picture when thumbnails
+are generated inline in the request against the background task queue.
+
+    python -m benchmarks.profile_picture_upload --requests 20 --width 4000
+"""
+import argparse
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+
+def make_picture(width, height):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.radial_gradient('L').resize((width, height)).convert('RGB').save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run(backend, requests, picture):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from api.tasks import get_backend
+
+    client = Client()
+    url = reverse("user-register", kwargs={"version": "v1"})
+    latencies = []
+    with override_settings(TASK_QUEUE_BACKEND=backend):
+        for i in range(requests):
+            data = {
+                'username': 'bench_{}_{}'.format(backend.rsplit('.', 1)[-1], i),
+                'password': 'bench-password',
+                'profile_picture': SimpleUploadedFile('bench.jpg', picture, content_type='image/jpeg'),
+            }
+            start = time.perf_counter()
+            response = client.post(url, data=data)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.content
+        executor = getattr(get_backend(), 'executor', None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import override_settings
+
+    picture = make_picture(args.width, args.height)
+    print('picture: {}x{}, {} KiB'.format(args.width, args.height, len(picture) // 1024))
+    # a cheap hasher keeps password hashing out of the measurement
+    with override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                           PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+        with benchmark_database():
+            summarize('inline thumbnails', run('api.tasks.ImmediateBackend', args.requests, picture))
+            summarize('background thumbnails', run('api.tasks.ThreadPoolBackend', args.requests, picture))
+
+
+if __name__ == '__main__':
+    main()
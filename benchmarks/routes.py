@@ -0,0 +1,285 @@
+"""
+Latency, throughput, allocation and query-count benchmark of every API route.
+
+    python -m benchmarks.routes --shirts 100000 --users 10000 --output results.json
+    python -m benchmarks.routes --shirts 100000 --users 10000 --compare results.json
+
+The database is seeded with ``benchmarks.fixtures``. Each route is requested in
+process through the Django test client. The suite reports p50/p99 latency,
+requests per second, the peak memory allocated per request (tracemalloc) and
+the number of queries of one request, which must stay within the route's
+budget. With ``--compare``, a p50 slower than the baseline by more than
+``--tolerance`` is a regression too. Budget overruns and regressions make the
+command exit with status 1, so it can gate a build. Routes returning whole
+tables are skipped when the fixture is larger than ``--unbounded-limit`` rows.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import benchmark_database, percentile, setup
+
+PASSWORD = 'bench-password'
+
+
+class Route:
+    """
+    A benchmarked request. ``make(context)`` returns ``(method, path, data)``.
+    """
+
+    def __init__(self, label, make, budget, requests=None, unbounded=False):
+        self.label = label
+        self.make = make
+        self.budget = budget
+        self.requests = requests
+        self.unbounded = unbounded
+
+
+def url(name, **kwargs):
+    from django.urls import reverse
+
+    return reverse(name, kwargs=kwargs)
+
+
+def refresh_token(context):
+    # every refresh rotates the token, so each request needs the previous response's token
+    token = context.refresh
+    context.refresh = None
+    return 'post', url('token_refresh'), {'refresh': token}
+
+
+ROUTES = [
+    Route('create-list-shirt GET v2', lambda c: ('get', url('create-list-shirt', version='v2'), {'page_size': 100}), 2),
+    Route('create-list-shirt GET v2 filtered', lambda c: (
+        'get', url('create-list-shirt', version='v2'), {'size_min': 10, 'size_max': 20, 'page_size': 100}), 2),
+    Route('create-list-shirt GET v1', lambda c: ('get', url('create-list-shirt', version='v1'), None), 2,
+          unbounded=True),
+    Route('create-list-shirt POST', lambda c: (
+        'post', url('create-list-shirt', version='v1'), {'name': 'bench', 'email': 'bench@example.com', 'size': 42}), 1),
+    Route('details-update-delete-shirt GET', lambda c: (
+        'get', url('details-update-delete-shirt', version='v1', pk=c.rng.randint(1, c.shirts)), None), 2),
+    Route('batch-shirt GET 50', lambda c: (
+        'get', url('batch-shirt', version='v1'), {'ids': ','.join(str(c.rng.randint(1, c.shirts)) for _ in range(50))}),
+          2),
+    Route('details-update-delete-shirt PUT', lambda c: (
+        'put', url('details-update-delete-shirt', version='v1', pk=c.rng.randint(1, c.shirts)),
+        {'size': c.rng.randint(1, 99)}), 1),
+    Route('details-update-delete-shirt DELETE', lambda c: (
+        'delete', url('details-update-delete-shirt', version='v1', pk=c.next_deleted()), None), 4),
+    Route('bulk-shirt POST 100', lambda c: (
+        'post', url('bulk-shirt', version='v1'),
+        [{'name': 'bulk', 'email': 'bulk@example.com', 'size': i % 99 + 1} for i in range(100)]), 3),
+    Route('search-shirt GET', lambda c: (
+        'get', url('search-shirt', version='v1'), {'q': 'shirt {:05d}'.format(c.rng.randrange(c.shirts // 100 or 1))}), 2),
+    Route('stats-shirt GET', lambda c: ('get', url('stats-shirt', version='v1'), None), 1),
+    Route('export-shirt GET', lambda c: ('get', url('export-shirt', version='v1'), None), 1, requests=5,
+          unbounded=True),
+    Route('user-register POST', lambda c: (
+        'post', url('user-register', version='v1'), {'username': c.username(), 'password': PASSWORD}), 2,
+          requests=20),
+    Route('user-bulk-register POST 10', lambda c: (
+        'post', url('user-bulk-register', version='v1'),
+        [{'username': c.username(), 'password': PASSWORD} for _ in range(10)]), 13, requests=5),
+    Route('user-list GET', lambda c: ('get', url('user-list', version='v1'), None), 2, unbounded=True),
+    Route('user-details GET', lambda c: (
+        'get', url('user-details', version='v1', pk=c.rng.randint(2, c.users + 1)), None), 2),
+    Route('user-batch GET 50', lambda c: (
+        'get', url('user-batch', version='v1'), {'ids': ','.join(str(c.rng.randint(2, c.users + 1)) for _ in range(50))}),
+          2),
+    Route('user-search GET', lambda c: (
+        'get', url('user-search', version='v1'), {'q': 'user{:05d}'.format(c.rng.randrange(c.users // 100 or 1))}), 2),
+    Route('user-update PUT', lambda c: (
+        'put', url('user-update', version='v1', pk=c.rng.randint(2, c.users + 1)), {'first_name': 'updated'}), 1),
+    Route('user-export GET', lambda c: ('get', url('user-export', version='v1'), None), 1, requests=5,
+          unbounded=True),
+    Route('token_obtain_pair POST', lambda c: (
+        'post', url('token_obtain_pair'), {'username': 'bench-admin', 'password': PASSWORD}), 2, requests=20),
+    Route('token_refresh POST', refresh_token, 8),
+    Route('cache-stats GET', lambda c: ('get', url('cache-stats'), None), 0),
+    Route('metrics GET', lambda c: ('get', url('metrics'), None), 0),
+    Route('schema-file GET', lambda c: ('get', url('schema-file', fmt='json'), None), 0),
+]
+
+
+class Context:
+    """
+    Fixture sizes, the client and the state routes need between requests
+    """
+
+    def __init__(self, client, shirts, users, seed=0):
+        self.client = client
+        self.shirts = shirts
+        self.users = users
+        self.rng = random.Random(seed)
+        self.deleted = shirts
+        self.registered = 0
+        self.refresh = None
+
+    def next_deleted(self):
+        # delete from the end of the fixture, one shirt per request
+        self.deleted -= 1
+        return self.deleted + 1
+
+    def username(self):
+        self.registered += 1
+        return 'registered{}'.format(self.registered)
+
+    def request(self, route):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from user.models import User
+
+        if route.make is refresh_token and self.refresh is None:
+            self.refresh = str(RefreshToken.for_user(User.objects.get(username='bench-admin')))
+        method, path, data = route.make(self)
+        if method == 'get':
+            response = self.client.get(path, data)
+        else:
+            response = getattr(self.client, method)(
+                path, data=json.dumps(data) if data is not None else None, content_type='application/json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if route.make is refresh_token:
+            self.refresh = response.json()['refresh']
+        assert response.status_code < 400, (route.label, response.status_code, response.content[:200])
+        return response
+
+
+def measure(context, route, requests, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        context.request(route)
+
+    with CaptureQueriesContext(connection) as queries:
+        context.request(route)
+    # captured_queries slices connection.queries_log, which later requests reset
+    query_count = len(queries)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        context.request(route)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(requests, 10)):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            context.request(route)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'peak_alloc_kib': round(statistics.median(peaks) / 1024, 1),
+        'queries': query_count,
+        'query_budget': route.budget,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return the failures of ``results``: query budget overruns, and p50 latency
+    regressions against ``baseline``.
+    """
+    failures = []
+    for label, result in results['routes'].items():
+        if result['queries'] > result['query_budget']:
+            failures.append('{}: {} queries, budget {}'.format(label, result['queries'], result['query_budget']))
+        previous = (baseline or {}).get('routes', {}).get(label)
+        if previous and result['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            failures.append('{}: p50 {:.2f}ms, baseline {:.2f}ms'.format(label, result['p50_ms'], previous['p50_ms']))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shirts', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--routes', nargs='*', help='only run routes whose label starts with one of these')
+    parser.add_argument('--unbounded-limit', type=int, default=100000)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --output')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown, 0.25 = 25%%')
+    args = parser.parse_args()
+
+    setup()
+    import django
+    from django.test import Client
+
+    from benchmarks.fixtures import seed_shirts, seed_users
+    from user.models import User
+
+    routes = [
+        route for route in ROUTES
+        if not args.routes or any(route.label.startswith(prefix) for prefix in args.routes)
+    ]
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'cpus': os.cpu_count(),
+            'shirts': args.shirts,
+            'users': args.users,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'routes': {},
+    }
+
+    with benchmark_database():
+        started = time.perf_counter()
+        seed_shirts(args.shirts)
+        seed_users(args.users)
+        User.objects.create_superuser(username='bench-admin', password=PASSWORD)
+        print('seeded {} shirts and {} users in {:.1f}s'.format(args.shirts, args.users, time.perf_counter() - started))
+
+        client = Client()
+        token = client.post('/api/token/', {'username': 'bench-admin', 'password': PASSWORD}).json()['access']
+        client.defaults['HTTP_AUTHORIZATION'] = 'Bearer ' + token
+        context = Context(client, args.shirts, args.users)
+
+        print('{:<40} {:>9} {:>9} {:>9} {:>10} {:>8}'.format('route', 'p50 ms', 'p99 ms', 'req/s', 'peak KiB', 'queries'))
+        for route in routes:
+            if route.unbounded and max(args.shirts, args.users) > args.unbounded_limit:
+                print('{:<40} skipped: returns every row'.format(route.label))
+                continue
+            result = measure(context, route, route.requests or args.requests, args.warmup)
+            results['routes'][route.label] = result
+            print('{:<40} {p50_ms:9.2f} {p99_ms:9.2f} {throughput_rps:9.1f} {peak_alloc_kib:10.1f} {queries:5}/{query_budget}'
+                  .format(route.label, **result))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print('FAIL ' + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
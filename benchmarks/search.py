@@ -0,0 +1,68 @@
+"""
+Latency of the search engines: FTS5 index against ``icontains`` scans.
+
+    python -m benchmarks.search --rows 1000000 --repeat 5
+
+Shirts and users are seeded with ``benchmarks.fixtures`` (the FTS5 indexes are
+filled by their triggers while seeding). Each query fetches the first page of
+results and their count, like the search endpoints do, with both engines.
+"""
+import argparse
+import time
+
+from benchmarks.common import benchmark_database, percentile, setup
+
+QUERIES = {
+    'shirts': ['shirt 0012345', 'shirt 00999', 'owner42', 'example'],
+    'users': ['user0012345', 'user00999', 'ada', 'grace bench'],
+}
+
+
+def run(engine, queryset, fields, q, page_size):
+    from api.search import TERM
+
+    results = engine.search(queryset, TERM.findall(q), fields)
+    return results.count(), len(results[:page_size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from api.search import FTS5Engine, IcontainsEngine
+    from benchmarks.fixtures import seed_shirts, seed_users
+    from shirt.models import Shirt
+    from user.models import User
+
+    with benchmark_database():
+        started = time.perf_counter()
+        seed_shirts(args.rows)
+        seed_users(args.rows)
+        print('seeded {0} shirts and {0} users in {1:.1f}s'.format(args.rows, time.perf_counter() - started))
+
+        print('{:<8} {:<16} {:>9} {:>14} {:>14} {:>9}'.format(
+            'table', 'query', 'matches', 'fts5 p50 ms', 'icontains ms', 'speedup'))
+        for name, queryset, fields in (
+                ('shirts', Shirt.objects.all(), ('name', 'email')),
+                ('users', User.objects.filter(is_active=True), ('username', 'first_name', 'last_name', 'email'))):
+            for q in QUERIES[name]:
+                timings = {}
+                for engine in (FTS5Engine(), IcontainsEngine()):
+                    seconds = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        count, _ = run(engine, queryset, fields, q, args.page_size)
+                        seconds.append(time.perf_counter() - start)
+                    timings[type(engine).__name__] = (percentile(seconds, 50), count)
+                (fts, fts_count), (scan, scan_count) = timings['FTS5Engine'], timings['IcontainsEngine']
+                # icontains also matches inside words, so it may find more rows
+                print('{:<8} {:<16} {:>9} {:>14.2f} {:>14.2f} {:>8.0f}x'.format(
+                    name, q, '{}/{}'.format(fts_count, scan_count), fts * 1000, scan * 1000, scan / fts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Rows per second of the list serialization paths: ModelSerializer and
+JSONRenderer against ``values_list()`` rows, ``RowSerializer`` and
+``FastJSONRenderer``.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+
+Both paths start from the queryset and end with the rendered bytes, which are
+checked to be identical.
+"""
+import argparse
+import time
+
+from benchmarks.common import benchmark_database, setup
+
+
+def model_serializer(queryset, serializer_class, context):
+    from rest_framework.renderers import JSONRenderer
+
+    return JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+
+
+def row_serializer(queryset, serializer_class, context):
+    from api.fast import RowSerializer
+    from api.renderers import FastJSONRenderer
+
+    rows = RowSerializer.compile(serializer_class(context=context))
+    return FastJSONRenderer().render(rows.to_dicts(queryset.values_list(*rows.columns)))
+
+
+def best_of(repeat, func, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.test import APIRequestFactory
+
+    from benchmarks.fixtures import seed_shirts, seed_users
+    from shirt.models import Shirt
+    from shirt.serializers import ShirtSerializer
+    from user.models import User
+    from user.serializers import UserWithoutPasswordSerializer
+
+    with benchmark_database():
+        seed_shirts(args.rows)
+        seed_users(args.rows)
+        User.objects.filter(pk__lte=args.rows // 2).update(
+            profile_picture='profile-pictures/bench.jpg',
+            profile_picture_variants={'64': {'webp': 'profile-pictures/bench-64.webp'}})
+        context = {'request': APIRequestFactory().get('/')}
+
+        for name, queryset, serializer_class in (
+                ('shirts', Shirt.objects.order_by('pk'), ShirtSerializer),
+                ('users', User.objects.order_by('pk'), UserWithoutPasswordSerializer)):
+            slow, slow_bytes = best_of(args.repeat, model_serializer, queryset, serializer_class, context)
+            fast, fast_bytes = best_of(args.repeat, row_serializer, queryset, serializer_class, context)
+            assert slow_bytes == fast_bytes, name
+            print('{:<8} ModelSerializer {:>10.0f} rows/s   values_list {:>10.0f} rows/s   {:.1f}x'.format(
+                name, args.rows / slow, args.rows / fast, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Signups per second, and per core, with the real password hasher.
+
+    python -m benchmarks.signups --threads 4 --signups 10 --bulk 50
+
+Compares the previous registration (INSERT with the raw password, then hash on
+the request thread and UPDATE) with the single INSERT after hashing on the
+password pool, and the bulk registration endpoint.
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+counter = itertools.count()
+
+
+def legacy_serializer():
+    from user.serializers import UserSerializer
+
+    class LegacyUserSerializer(UserSerializer):
+        def create(self, validated_data):
+            user = super(UserSerializer, self).create(validated_data)
+            user.set_password(validated_data['password'])
+            user.save()
+            user.password = None
+            return user
+
+    return LegacyUserSerializer
+
+
+def worker(view, signups, latencies, lock):
+    from django.db import connection
+    from rest_framework.test import APIRequestFactory
+
+    factory = APIRequestFactory()
+    local = []
+    try:
+        for _ in range(signups):
+            data = {'username': 'bench{}'.format(next(counter)), 'password': 'bench-password'}
+            request = factory.post('/api/v1/users/', data, format='json')
+            start = time.perf_counter()
+            response = view(request, version='v1')
+            local.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.data
+    finally:
+        connection.close()
+    with lock:
+        latencies.extend(local)
+
+
+def run_single(serializer_class, threads, signups):
+    from user.views import UserRegisterView
+
+    view = UserRegisterView.as_view(serializer_class=serializer_class)
+    latencies, lock = [], threading.Lock()
+    pool = [threading.Thread(target=worker, args=(view, signups, latencies, lock)) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def run_bulk(admin, size):
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from user.views import UserBulkRegisterView
+
+    items = [{'username': 'bulk{}'.format(next(counter)), 'password': 'bench-password'} for _ in range(size)]
+    request = APIRequestFactory().post('/api/v1/users/bulk', items, format='json')
+    force_authenticate(request, user=admin)
+    started = time.perf_counter()
+    response = UserBulkRegisterView.as_view()(request, version='v1')
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 201, response.data
+    return elapsed
+
+
+def report(name, count, elapsed, cores):
+    print('{:<24} {:8.1f} signups/s {:8.1f} signups/s/core'.format(name, count / elapsed, count / elapsed / cores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--signups', type=int, default=10, help='signups per thread')
+    parser.add_argument('--bulk', type=int, default=50, help='users per bulk request')
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+
+    from user.models import User
+    from user.serializers import UserSerializer
+
+    cores = min(settings.PASSWORD_HASH_WORKERS or os.cpu_count(), os.cpu_count())
+    print('{} CPUs, {} hashing threads'.format(os.cpu_count(), cores))
+    with benchmark_database():
+        admin = User.objects.create_superuser(username='bench-admin', password='bench-password')
+        for name, serializer_class in (('insert + hash + update', legacy_serializer()),
+                                       ('hash pool + insert', UserSerializer)):
+            latencies, elapsed = run_single(serializer_class, args.threads, args.signups)
+            report(name, len(latencies), elapsed, cores)
+            summarize(name, latencies)
+        report('bulk registration', args.bulk, run_bulk(admin, args.bulk), cores)
+
+
+if __name__ == '__main__':
+    main()
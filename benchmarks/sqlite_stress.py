@@ -0,0 +1,125 @@
+"""
+Concurrent read/write stress test of Django's stock SQLite backend against
+``api.backends.sqlite3``.
+
+    python -m benchmarks.sqlite_stress --writers 4 --readers 8 --seconds 5
+
+Writer threads run transactions which read a shirt and then update it, reader
+threads page through shirts. Each backend gets its own database file; the
+script reports operations per second, latencies and "database is locked"
+errors.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.common import setup, summarize
+
+BACKENDS = (
+    ('stock', 'django.db.backends.sqlite3'),
+    ('tuned', 'api.backends.sqlite3'),
+)
+
+
+def add_database(alias, engine, path):
+    from django.db import connections
+
+    connections.settings[alias] = dict(connections.settings['default'], ENGINE=engine, NAME=path, OPTIONS={})
+
+
+def seed(alias, rows, batch_size=10000):
+    from django.db import connections
+
+    from benchmarks.fixtures import batches
+    from shirt.models import Shirt
+
+    with connections[alias].schema_editor() as editor:
+        editor.create_model(Shirt)
+    for start, size in batches(rows, batch_size):
+        Shirt.objects.using(alias).bulk_create([
+            Shirt(name='shirt {}'.format(start + i), email='stress@example.com', size=(start + i) % 99 + 1)
+            for i in range(size)
+        ])
+
+
+def write(alias, rng, rows):
+    from django.db import transaction
+
+    from shirt.models import Shirt
+
+    pk = rng.randint(1, rows)
+    with transaction.atomic(using=alias):
+        shirt = Shirt.objects.using(alias).get(pk=pk)
+        Shirt.objects.using(alias).filter(pk=pk).update(size=shirt.size % 99 + 1)
+
+
+def read(alias, rng, rows):
+    from shirt.models import Shirt
+
+    start = rng.randint(1, rows)
+    list(Shirt.objects.using(alias).filter(pk__gte=start).order_by('pk')[:100])
+
+
+def worker(operation, alias, rows, deadline, results, lock, seed):
+    from django.db import OperationalError, connections
+
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(alias, rng, rows)
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connections[alias].close()
+    with lock:
+        results[operation.__name__][0].extend(latencies)
+        results[operation.__name__][1] += errors
+
+
+def run(alias, rows, writers, readers, seconds):
+    results, lock = {'write': [[], 0], 'read': [[], 0]}, threading.Lock()
+    deadline = time.perf_counter() + seconds
+    pool = [
+        threading.Thread(target=worker, args=(operation, alias, rows, deadline, results, lock, i))
+        for i, operation in enumerate([write] * writers + [read] * readers)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup()
+    directory = tempfile.mkdtemp()
+    for alias, engine in BACKENDS:
+        add_database(alias, engine, os.path.join(directory, '{}.sqlite3'.format(alias)))
+        seed(alias, args.rows)
+        results = run(alias, args.rows, args.writers, args.readers, args.seconds)
+        for operation, (latencies, errors) in sorted(results.items()):
+            print('{} {}: {:.1f} ops/s, {} "database is locked" errors'.format(
+                alias, operation, len(latencies) / args.seconds, errors))
+            if latencies:
+                summarize('{} {}'.format(alias, operation), latencies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Refresh token throughput under concurrent load, with simplejwt's stock
+blacklist check against the Bloom filter backed one.
+
+    python -m benchmarks.token_refresh --threads 8 --refreshes 200 --blacklisted 100000
+
+Each thread keeps rotating its own refresh token; the blacklist is seeded with
+``--blacklisted`` unexpired entries first.
+"""
+import argparse
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from benchmarks.common import benchmark_database, setup, summarize
+
+
+def seed_blacklist(count, batch_size=5000):
+    from django.utils import timezone
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    expires_at = timezone.now() + timedelta(days=7)
+    for start in range(0, count, batch_size):
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(jti=uuid.uuid4().hex, token='', expires_at=expires_at)
+            for _ in range(min(batch_size, count - start))
+        ])
+        if tokens[0].pk is None:
+            tokens = OutstandingToken.objects.filter(jti__in=[token.jti for token in tokens])
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+
+
+def worker(view, token, refreshes, latencies, lock):
+    from django.db import connection
+    from rest_framework.test import APIRequestFactory
+
+    factory = APIRequestFactory()
+    local = []
+    try:
+        for _ in range(refreshes):
+            request = factory.post('/api/token/refresh/', {'refresh': token}, format='json')
+            start = time.perf_counter()
+            response = view(request)
+            local.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.data
+            token = response.data['refresh']
+    finally:
+        connection.close()
+    with lock:
+        latencies.extend(local)
+
+
+def run(serializer_class, user, threads, refreshes):
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from rest_framework_simplejwt.views import TokenRefreshView
+
+    view = TokenRefreshView.as_view(serializer_class=serializer_class)
+    latencies, lock = [], threading.Lock()
+    pool = [
+        threading.Thread(target=worker, args=(view, str(RefreshToken.for_user(user)), refreshes, latencies, lock))
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--refreshes', type=int, default=200, help='refreshes per thread')
+    parser.add_argument('--blacklisted', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework_simplejwt.serializers import TokenRefreshSerializer as StockSerializer
+
+    from user.models import User
+    from user.tokens import TokenRefreshSerializer, blacklist_filter
+
+    with benchmark_database():
+        user = User.objects.create_user(username='bench', password='bench-password')
+        seed_blacklist(args.blacklisted)
+        blacklist_filter.sync()
+        for name, serializer_class in (('stock blacklist', StockSerializer),
+                                       ('bloom filter blacklist', TokenRefreshSerializer)):
+            latencies, elapsed = run(serializer_class, user, args.threads, args.refreshes)
+            print('{}: {:.1f} refreshes/s'.format(name, len(latencies) / elapsed))
+            summarize(name, latencies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration of the production server.
+
+    gunicorn api.wsgi                                            # threaded WSGI workers
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn api.asgi   # ASGI workers
+
+Every setting can be overridden with the environment variable named in its line.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Processes scale with the CPU count; threads let each process overlap requests
+# waiting on the database or on slow clients.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Workers do not share memory, so the detail cache must live outside of them
+# (see CACHES in api/settings.py). Unless a cache directory is configured, use a
+# fresh one, emptied at startup so that no entry outlives a deploy.
+default_cache_dir = os.path.join(tempfile.gettempdir(), 'tees-cache')
+if workers > 1 and 'DJANGO_CACHE_DIR' not in os.environ:
+    os.environ['DJANGO_CACHE_DIR'] = default_cache_dir
+
+
+def on_starting(server):
+    if os.environ.get('DJANGO_CACHE_DIR') == default_cache_dir:
+        shutil.rmtree(default_cache_dir, ignore_errors=True)
+
+
+# Import Django and the URLconf once in the master and fork ready workers.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then to bound the effect of memory leaks.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
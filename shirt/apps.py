@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ShirtConfig(AppConfig):
     name = 'shirt'
+
+    def ready(self):
+        from shirt import signals  # noqa: F401
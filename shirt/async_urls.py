@@ -0,0 +1,15 @@
+from django.urls import path
+
+from shirt.async_views import (AsyncBatchShirtView, AsyncCreateListShirtView, AsyncExportShirtView,
+                               AsyncShirtDetailsUpdateDeleteView, AsyncSearchShirtView, AsyncShirtStatsView)
+from shirt.views import BulkShirtView
+
+urlpatterns = [
+    path("", AsyncCreateListShirtView.as_view(), name="create-list-shirt"),
+    path("bulk", BulkShirtView.as_view(), name="bulk-shirt"),
+    path("batch", AsyncBatchShirtView.as_view(), name="batch-shirt"),
+    path("search", AsyncSearchShirtView.as_view(), name="search-shirt"),
+    path("stats", AsyncShirtStatsView.as_view(), name="stats-shirt"),
+    path("export", AsyncExportShirtView.as_view(), name="export-shirt"),
+    path("<str:pk>", AsyncShirtDetailsUpdateDeleteView.as_view(), name="details-update-delete-shirt"),
+]
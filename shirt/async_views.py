@@ -0,0 +1,116 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.async_views import (AsyncAPIView, AsyncCreateModelMixin, AsyncDestroyModelMixin, AsyncGenericAPIView,
+                             AsyncListModelMixin, AsyncRetrieveModelMixin)
+from api.batch import BatchRetrieveMixin
+from api.cache import CachedRetrieveMixin, get_lookup_pk
+from api.conditional import ListValidatorsMixin, ObjectValidatorsMixin, aconditional, precondition_failed
+from api.export import ndjson_response
+from api.fast import FastListMixin
+from api.orm import aupdate_returning
+from api.pagination import IdCursorPagination, SearchPagination, VersionedPaginationMixin
+from api.search import SearchFilter
+from api.sparse import SparseFieldsMixin
+from shirt.filters import ShirtFilterBackend
+from shirt.models import Shirt
+from shirt.serializers import ShirtSerializer
+from shirt.stats import stats_queryset, summarize
+
+
+class AsyncCreateListShirtView(SparseFieldsMixin, ListValidatorsMixin, VersionedPaginationMixin, FastListMixin,
+                               AsyncListModelMixin, AsyncCreateModelMixin, AsyncGenericAPIView):
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+    pagination_class = IdCursorPagination
+    filter_backends = [ShirtFilterBackend]
+
+    @aconditional
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.acreate(request, *args, **kwargs)
+
+
+class AsyncSearchShirtView(SparseFieldsMixin, AsyncListModelMixin, AsyncGenericAPIView):
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+    filter_backends = [SearchFilter]
+    pagination_class = SearchPagination
+    search_fields = ('name', 'email')
+
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+
+class AsyncExportShirtView(AsyncGenericAPIView):
+    """
+    Stream every shirt as newline-delimited JSON from an async iterator
+    """
+    queryset = Shirt.objects.order_by('pk')
+    serializer_class = ShirtSerializer
+    filter_backends = [ShirtFilterBackend]
+
+    async def get(self, request, *args, **kwargs):
+        return ndjson_response(
+            self.filter_queryset(self.get_queryset()),
+            ShirtSerializer.Meta.fields,
+            filename='shirts.ndjson',
+            asynchronous=True
+        )
+
+
+class AsyncShirtStatsView(AsyncAPIView):
+
+    async def get(self, request, *args, **kwargs):
+        return Response(summarize([row async for row in stats_queryset()]))
+
+
+class AsyncBatchShirtView(SparseFieldsMixin, BatchRetrieveMixin, AsyncGenericAPIView):
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+
+    async def get(self, request, *args, **kwargs):
+        return await self.abatch_retrieve(request, *args, **kwargs)
+
+
+class AsyncShirtDetailsUpdateDeleteView(SparseFieldsMixin, ObjectValidatorsMixin, CachedRetrieveMixin,
+                                        AsyncRetrieveModelMixin, AsyncDestroyModelMixin, AsyncGenericAPIView):
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+
+    @aconditional
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+    @aconditional
+    async def put(self, request, *args, **kwargs):
+        serializer = ShirtSerializer(data=request.data, partial=True)
+        await self.avalidate(serializer)
+
+        pk = get_lookup_pk(self)
+        values = dict(serializer.validated_data, updated_at=timezone.now())
+        queryset = self.precondition_queryset(self.get_queryset().filter(pk=pk))
+        shirts = await aupdate_returning(queryset, values) if pk is not None else []
+        if not shirts:
+            if self.matched_last_modified is not None:
+                # changed since the preconditions were checked
+                return precondition_failed()
+            return Response(
+                data={
+                    "message": "Shirt with id: {} does not exist".format(kwargs["pk"])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(ShirtSerializer(shirts[0]).data)
+
+    async def patch(self, request, *args, **kwargs):
+        # 404 for a missing shirt, like the synchronous partial update
+        await self.aget_object()
+        return await self.put(request, *args, **kwargs)
+
+    async def delete(self, request, *args, **kwargs):
+        return await self.adestroy(request, *args, **kwargs)
@@ -0,0 +1,76 @@
+import sys
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from api.orm import in_integer_range
+
+SURROGATES_START, SURROGATES_END = 0xD800, 0xDFFF
+
+INTEGER_FILTERS = {
+    'size': 'size',
+    'size_min': 'size__gte',
+    'size_max': 'size__lte',
+}
+
+
+def prefix_upper_bound(prefix):
+    """
+    Return the smallest string greater than every string starting with ``prefix``,
+    or ``None`` when there is none (the prefix is made of U+10FFFF only).
+    Surrogates cannot be encoded, so U+D7FF is followed by U+E000.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code_point = ord(prefix[-1]) + 1
+    if SURROGATES_START <= code_point <= SURROGATES_END:
+        code_point = SURROGATES_END + 1
+    return prefix[:-1] + chr(code_point)
+
+
+def filter_shirts(queryset, params):
+    """
+    Apply the shirt list filters found in ``params`` to ``queryset``.
+
+    - ``email``: exact match, served by the (email, size) index
+    - ``size``, ``size_min``, ``size_max``: exact size or inclusive range
+    - ``name``: case-sensitive prefix, expressed as a range so that it can seek
+      on the name index on every backend (``LIKE 'x%'`` cannot use it on SQLite)
+    """
+    lookups = {}
+    errors = {}
+    size_field = queryset.model._meta.get_field('size')
+
+    if params.get('email'):
+        lookups['email'] = params['email']
+
+    for param, lookup in INTEGER_FILTERS.items():
+        if params.get(param):
+            try:
+                value = int(params[param])
+            except ValueError:
+                value = None
+            if value is None or not in_integer_range(value, size_field, queryset.db):
+                errors[param] = ["A valid integer is required."]
+            else:
+                lookups[lookup] = value
+
+    if params.get('name'):
+        lookups['name__gte'] = params['name']
+        upper_bound = prefix_upper_bound(params['name'])
+        if upper_bound is not None:
+            lookups['name__lt'] = upper_bound
+
+    if errors:
+        raise ValidationError(errors)
+    return queryset.filter(**lookups)
+
+
+class ShirtFilterBackend(BaseFilterBackend):
+    """
+    Filter shirts by ``email``, ``size``, ``size_min``, ``size_max`` and ``name`` prefix
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_shirts(queryset, request.query_params)
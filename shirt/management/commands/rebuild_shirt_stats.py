@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from shirt.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recount the shirt stats (per size and per email domain) from the shirts table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='database alias to rebuild')
+
+    def handle(self, *args, **options):
+        buckets, drifted = rebuild(using=options['database'])
+        self.stdout.write('Rebuilt {} shirt stat buckets, {} had drifted'.format(buckets, drifted))
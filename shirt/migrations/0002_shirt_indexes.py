@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shirt', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shirt',
+            name='size',
+            field=models.IntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='shirt',
+            index=models.Index(fields=['email', 'size'], name='shirt_email_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shirt',
+            index=models.Index(fields=['size'], name='shirt_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shirt',
+            index=models.Index(fields=['name'], name='shirt_name_idx'),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:45
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Lower, StrIndex, Substr
+
+# Row-level triggers keep shirt_shirtstat in step with shirt_shirt, whichever
+# path writes the shirts (save(), bulk_create(), bulk_update(), update(), raw SQL).
+SQLITE_DOMAIN = "lower(CASE WHEN instr({row}.email, '@') > 0 THEN substr({row}.email, instr({row}.email, '@') + 1) ELSE '' END)"
+SQLITE_UPSERT = (
+    "INSERT INTO shirt_shirtstat (dimension, bucket, \"count\") VALUES ('{dimension}', {bucket}, {delta}) "
+    "ON CONFLICT (dimension, bucket) DO UPDATE SET \"count\" = \"count\" + excluded.\"count\";"
+)
+
+
+def sqlite_apply(row, delta, dimensions=('size', 'email_domain')):
+    buckets = {'size': 'CAST({}.size AS TEXT)'.format(row), 'email_domain': SQLITE_DOMAIN.format(row=row)}
+    return ' '.join(SQLITE_UPSERT.format(dimension=dimension, bucket=buckets[dimension], delta=delta)
+                    for dimension in dimensions)
+
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER shirt_stat_insert AFTER INSERT ON shirt_shirt BEGIN {} END".format(sqlite_apply('NEW', 1)),
+    "CREATE TRIGGER shirt_stat_delete AFTER DELETE ON shirt_shirt BEGIN {} END".format(sqlite_apply('OLD', -1)),
+    "CREATE TRIGGER shirt_stat_update_size AFTER UPDATE OF size ON shirt_shirt WHEN OLD.size <> NEW.size "
+    "BEGIN {} {} END".format(sqlite_apply('OLD', -1, ['size']), sqlite_apply('NEW', 1, ['size'])),
+    "CREATE TRIGGER shirt_stat_update_email_domain AFTER UPDATE OF email ON shirt_shirt WHEN {} <> {} "
+    "BEGIN {} {} END".format(SQLITE_DOMAIN.format(row='OLD'), SQLITE_DOMAIN.format(row='NEW'),
+                             sqlite_apply('OLD', -1, ['email_domain']), sqlite_apply('NEW', 1, ['email_domain'])),
+]
+
+POSTGRESQL_TRIGGERS = [
+    """
+    CREATE FUNCTION shirt_email_domain(email text) RETURNS text AS $$
+        SELECT lower(CASE WHEN strpos(email, '@') > 0 THEN substr(email, strpos(email, '@') + 1) ELSE '' END)
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE FUNCTION shirt_stat_apply(p_dimension text, p_bucket text, p_delta bigint) RETURNS void AS $$
+        INSERT INTO shirt_shirtstat (dimension, bucket, "count") VALUES (p_dimension, p_bucket, p_delta)
+        ON CONFLICT (dimension, bucket) DO UPDATE SET "count" = shirt_shirtstat."count" + excluded."count"
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE FUNCTION shirt_stat_maintain() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.size = NEW.size
+                AND shirt_email_domain(OLD.email) = shirt_email_domain(NEW.email) THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM shirt_stat_apply('size', OLD.size::text, -1);
+            PERFORM shirt_stat_apply('email_domain', shirt_email_domain(OLD.email), -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM shirt_stat_apply('size', NEW.size::text, 1);
+            PERFORM shirt_stat_apply('email_domain', shirt_email_domain(NEW.email), 1);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER shirt_stat_maintain AFTER INSERT OR DELETE OR UPDATE OF size, email ON shirt_shirt "
+    "FOR EACH ROW EXECUTE FUNCTION shirt_stat_maintain()",
+]
+
+TRIGGERS = {
+    'sqlite': (SQLITE_TRIGGERS, [
+        'DROP TRIGGER shirt_stat_insert',
+        'DROP TRIGGER shirt_stat_delete',
+        'DROP TRIGGER shirt_stat_update_size',
+        'DROP TRIGGER shirt_stat_update_email_domain',
+    ]),
+    'postgresql': (POSTGRESQL_TRIGGERS, [
+        'DROP TRIGGER shirt_stat_maintain ON shirt_shirt',
+        'DROP FUNCTION shirt_stat_maintain()',
+        'DROP FUNCTION shirt_stat_apply(text, text, bigint)',
+        'DROP FUNCTION shirt_email_domain(text)',
+    ]),
+}
+
+
+def install_triggers(apps, schema_editor):
+    for statement in TRIGGERS.get(schema_editor.connection.vendor, ([], []))[0]:
+        schema_editor.execute(statement)
+
+    # count the existing shirts, the email domain computed like the triggers do
+    alias = schema_editor.connection.alias
+    ShirtStat = apps.get_model('shirt', 'ShirtStat')
+    shirts = apps.get_model('shirt', 'Shirt').objects.using(alias).order_by()
+    sizes = shirts.values_list('size').annotate(count=Count('pk'))
+    domains = shirts.annotate(at=StrIndex('email', Value('@'))).annotate(
+        domain=Lower(Case(When(at__gt=0, then=Substr('email', F('at') + 1)), default=Value('')))
+    ).values_list('domain').annotate(count=Count('pk'))
+    ShirtStat.objects.using(alias).bulk_create(
+        [ShirtStat(dimension='size', bucket=str(size), count=count) for size, count in sizes]
+        + [ShirtStat(dimension='email_domain', bucket=domain, count=count) for domain, count in domains]
+    )
+
+
+def drop_triggers(apps, schema_editor):
+    for statement in TRIGGERS.get(schema_editor.connection.vendor, ([], []))[1]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shirt', '0003_shirt_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShirtStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('size', 'Size'), ('email_domain', 'Email domain')], max_length=16)),
+                ('bucket', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='shirtstat',
+            constraint=models.UniqueConstraint(fields=('dimension', 'bucket'), name='shirt_stat_bucket_uniq'),
+        ),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# SQLite FTS5 index of shirt_shirt, an external content table kept in step by triggers
+CREATE_INDEX = [
+    "CREATE VIRTUAL TABLE shirt_shirt_search USING fts5(name, email,"
+    " content='shirt_shirt', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    """
+    CREATE TRIGGER shirt_shirt_search_insert AFTER INSERT ON shirt_shirt BEGIN
+        INSERT INTO shirt_shirt_search(rowid, name, email)
+            VALUES (new.id, new.name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER shirt_shirt_search_delete AFTER DELETE ON shirt_shirt BEGIN
+        INSERT INTO shirt_shirt_search(shirt_shirt_search, rowid, name, email)
+            VALUES ('delete', old.id, old.name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER shirt_shirt_search_update AFTER UPDATE OF name, email ON shirt_shirt
+    WHEN old.name IS NOT new.name
+        OR old.email IS NOT new.email BEGIN
+        INSERT INTO shirt_shirt_search(shirt_shirt_search, rowid, name, email)
+            VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO shirt_shirt_search(rowid, name, email)
+            VALUES (new.id, new.name, new.email);
+    END
+    """,
+    "INSERT INTO shirt_shirt_search(shirt_shirt_search) VALUES ('rebuild')",
+    "INSERT INTO shirt_shirt_search(shirt_shirt_search, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+]
+
+DROP_INDEX = [
+    'DROP TRIGGER shirt_shirt_search_insert',
+    'DROP TRIGGER shirt_shirt_search_delete',
+    'DROP TRIGGER shirt_shirt_search_update',
+    'DROP TABLE shirt_shirt_search',
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_INDEX:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shirt', '0004_shirt_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -6,3 +6,31 @@ class Shirt(models.Model):
     name = models.CharField(max_length=255, null=False)
     email = models.CharField(max_length=255, null=False)
     size = models.IntegerField(null=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['email', 'size'], name='shirt_email_size_idx'),
+            models.Index(fields=['size'], name='shirt_size_idx'),
+            models.Index(fields=['name'], name='shirt_name_idx'),
+        ]
+
+
+class ShirtStat(models.Model):
+    """
+    Number of shirts per size and per email domain. The rows are maintained by
+    database triggers on ``shirt_shirt`` (see ``shirt.stats``), so every write
+    path, including bulk and ``QuerySet.update()``, keeps them current.
+    """
+    SIZE = 'size'
+    EMAIL_DOMAIN = 'email_domain'
+    DIMENSIONS = [(SIZE, 'Size'), (EMAIL_DOMAIN, 'Email domain')]
+
+    dimension = models.CharField(max_length=16, choices=DIMENSIONS)
+    bucket = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'bucket'], name='shirt_stat_bucket_uniq'),
+        ]
@@ -1,10 +1,48 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
+from api.bulk import BulkListSerializer
+from api.cache import detail_cache
+from api.metrics import TimedSerializerMixin
+from api.sparse import SparseFieldsSerializerMixin
 from shirt.models import Shirt
 
 
-class ShirtSerializer(serializers.ModelSerializer):
+class ShirtListSerializer(BulkListSerializer):
+    """
+    List serializer writing many shirts with ``bulk_create``/``bulk_update``
+    instead of one query per row.
+    """
+
+    def create(self, validated_data):
+        return Shirt.objects.bulk_create(
+            [Shirt(**attrs) for attrs in validated_data],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+
+    def update(self, instances, validated_data):
+        fields = {'updated_at'}
+        now = timezone.now()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+            # bulk_update() does not run pre_save(), so auto_now has to be applied here
+            instance.updated_at = now
+        if instances:
+            Shirt.objects.bulk_update(instances, fields, batch_size=settings.BULK_BATCH_SIZE)
+            for instance in instances:
+                detail_cache.invalidate(Shirt, instance.pk)
+        return instances
+
+
+class ShirtSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Shirt
         fields = ("id", "name", "email", "size")
+        list_serializer_class = ShirtListSerializer
+
+    async def acreate(self, validated_data):
+        return await Shirt.objects.acreate(**validated_data)
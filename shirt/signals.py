@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import detail_cache
+from shirt.models import Shirt
+
+
+@receiver(post_save, sender=Shirt)
+@receiver(post_delete, sender=Shirt)
+def invalidate_shirt(sender, instance, **kwargs):
+    detail_cache.invalidate(Shirt, instance.pk)
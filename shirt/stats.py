@@ -0,0 +1,79 @@
+"""
+Shirt counts per size and per email domain.
+
+``ShirtStat`` holds one row per bucket. Triggers installed by the
+``0004_shirt_stats`` migration apply every insert, update and delete of a shirt
+to it in the same statement (SQLite and PostgreSQL), so reading the stats costs
+one query over the buckets instead of a scan of the shirts. ``rebuild()``
+(``manage.py rebuild_shirt_stats``) recounts them from the shirts to repair
+drift, e.g. after restoring a backup taken without the triggers.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Lower, StrIndex, Substr
+
+from shirt.models import Shirt, ShirtStat
+
+
+def count_buckets(shirts):
+    """
+    Return ``{(dimension, bucket): count}`` of the ``shirts`` queryset, with the
+    email domain computed like the triggers do
+    """
+    counts = {
+        (ShirtStat.SIZE, str(size)): count
+        for size, count in shirts.order_by().values_list('size').annotate(count=Count('pk'))
+    }
+    domains = shirts.order_by().annotate(at=StrIndex('email', Value('@'))).annotate(
+        domain=Lower(Case(When(at__gt=0, then=Substr('email', F('at') + 1)), default=Value('')))
+    )
+    counts.update(
+        ((ShirtStat.EMAIL_DOMAIN, domain), count)
+        for domain, count in domains.values_list('domain').annotate(count=Count('pk'))
+    )
+    return counts
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """
+    Replace the stats with a recount of the shirts. Return the number of buckets
+    and the number of those whose count had drifted.
+    """
+    with transaction.atomic(using=using):
+        if connections[using].vendor == 'postgresql':
+            # SQLite's BEGIN IMMEDIATE already keeps writers out
+            with connections[using].cursor() as cursor:
+                cursor.execute('LOCK TABLE {} IN SHARE MODE'.format(Shirt._meta.db_table))
+        counts = count_buckets(Shirt.objects.using(using))
+        stats = ShirtStat.objects.using(using)
+        current = {(dimension, bucket): count for dimension, bucket, count in
+                   stats.filter(count__gt=0).values_list('dimension', 'bucket', 'count')}
+        drifted = sum(counts.get(key, 0) != current.get(key, 0) for key in counts.keys() | current.keys())
+        stats.all().delete()
+        stats.bulk_create([
+            ShirtStat(dimension=dimension, bucket=bucket, count=count)
+            for (dimension, bucket), count in counts.items()
+        ], batch_size=settings.BULK_BATCH_SIZE)
+    return len(counts), drifted
+
+
+def summarize(rows):
+    """
+    Shape ``(dimension, bucket, count)`` rows into the stats response: sizes in
+    ascending order, email domains by descending count
+    """
+    sizes = sorted((int(bucket), count) for dimension, bucket, count in rows if dimension == ShirtStat.SIZE)
+    domains = sorted(
+        ((bucket, count) for dimension, bucket, count in rows if dimension == ShirtStat.EMAIL_DOMAIN),
+        key=lambda item: (-item[1], item[0])
+    )
+    return {
+        "total": sum(count for _, count in sizes),
+        "size": [{"size": size, "count": count} for size, count in sizes],
+        "email_domain": [{"email_domain": domain, "count": count} for domain, count in domains],
+    }
+
+
+def stats_queryset():
+    return ShirtStat.objects.filter(count__gt=0).values_list('dimension', 'bucket', 'count')
@@ -1,13 +1,29 @@
+import io
 import json
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.views import status
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from shirt.models import Shirt
+from api.cache import detail_cache
+from api.fast import RowSerializer
+from api.tests import read_streaming
+from api import orm
+from api.orm import update_returning
+from api.pagination import IdCursorPagination
+from shirt.filters import filter_shirts, prefix_upper_bound
+from shirt.models import Shirt, ShirtStat
 from shirt.serializers import ShirtSerializer
+from user.authentication import user_cache
 from user.serializers import UserSerializer, UserWithoutPasswordSerializer
 
 User = get_user_model()
@@ -106,6 +122,8 @@ class BaseViewTest(APITestCase):
         )
 
     def setUp(self):
+        cache.clear()
+        user_cache.clear()
         # add test data
         self.user = User.objects.create_superuser(
             username="admin",
@@ -244,3 +262,884 @@ class DeleteShirtTest(BaseViewTest):
         # test with invalid data
         response = self.delete_shirt(100)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PaginateShirtTest(BaseViewTest):
+
+    def get_shirt_page(self, url=None, **params):
+        return self.client.get(
+            url or reverse("create-list-shirt", kwargs={"version": "v2"}),
+            data=params
+        )
+
+    def test_paginate_shirts(self):
+        """
+        This test ensures that v2 pages through shirts ordered by id
+        using opaque cursors
+        """
+        self.login_client('admin', 'testing')
+        for i in range(3):
+            self.add_shirt(name="page {}".format(i), email="page@test.com", size=30 + i)
+
+        response = self.get_shirt_page(page_size=2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s["id"] for s in response.data["results"]], [1, 2])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.get_shirt_page(url=response.data["next"])
+        self.assertEqual([s["id"] for s in response.data["results"]], [3, 4])
+
+        response = self.get_shirt_page(url=response.data["next"])
+        self.assertEqual([s["id"] for s in response.data["results"]], [5])
+        self.assertIsNone(response.data["next"])
+
+        response = self.get_shirt_page(url=response.data["previous"])
+        self.assertEqual([s["id"] for s in response.data["results"]], [3, 4])
+
+    def test_page_size_is_bounded(self):
+        """
+        This test ensures that clients cannot request pages larger than
+        the configured maximum
+        """
+        self.login_client('admin', 'testing')
+        with mock.patch.object(IdCursorPagination, 'max_page_size', 1):
+            response = self.get_shirt_page(page_size=100)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_invalid_cursor(self):
+        self.login_client('admin', 'testing')
+        response = self.get_shirt_page(cursor="not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_v1_is_not_paginated(self):
+        """
+        This test ensures that v1 keeps returning a plain list
+        """
+        self.login_client('admin', 'testing')
+        response = self.client.get(reverse("create-list-shirt", kwargs={"version": "v1"}))
+        self.assertIsInstance(response.data, list)
+
+
+class ExportShirtTest(BaseViewTest):
+
+    def test_export_shirts(self):
+        """
+        This test ensures that every shirt is streamed as one JSON
+        object per line
+        """
+        self.login_client('admin', 'testing')
+        response = self.client.get(reverse("export-shirt", kwargs={"version": "v1"}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(read_streaming(response)).decode().splitlines()
+        expected = ShirtSerializer(Shirt.objects.order_by("pk"), many=True)
+        self.assertEqual([json.loads(line) for line in lines], expected.data)
+
+    def test_export_requires_authentication(self):
+        response = self.client.get(reverse("export-shirt", kwargs={"version": "v1"}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkShirtTest(BaseViewTest):
+
+    def bulk(self, method, data):
+        return getattr(self.client, method)(
+            reverse("bulk-shirt", kwargs={"version": "v1"}),
+            data=json.dumps(data),
+            content_type='application/json',
+        )
+
+    def test_bulk_create_shirts(self):
+        """
+        This test ensures that valid shirts are created in bulk while
+        invalid ones are reported with their position
+        """
+        self.login_client('admin', 'testing')
+        response = self.bulk("post", [
+            {"name": "bulk 1", "email": "bulk1@test.com", "size": 10},
+            {"email": "bulk2@test.com", "size": 11},
+            {"name": "bulk 3", "email": "bulk3@test.com", "size": 12},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created", "error", "created"])
+        self.assertIn("name", response.data["results"][1]["errors"])
+        self.assertEqual(Shirt.objects.filter(name__startswith="bulk").count(), 2)
+
+        response = self.bulk("post", [{"name": "bulk 4", "email": "bulk4@test.com", "size": 13}])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_rejects_invalid_payload(self):
+        self.login_client('admin', 'testing')
+        response = self.bulk("post", {"name": "not a list"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(BULK_MAX_ITEMS=1):
+            response = self.bulk("post", [{"name": "a", "email": "a@test.com", "size": 1}] * 2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Shirt.objects.filter(name="a").exists())
+
+    def test_bulk_update_shirts(self):
+        """
+        This test ensures that shirts are partially updated in bulk and
+        that unknown ids are reported
+        """
+        self.login_client('admin', 'testing')
+        response = self.bulk("patch", [
+            {"id": 1, "size": 30},
+            {"id": 2, "name": "renamed"},
+            {"id": 1000, "size": 1},
+            {"id": 2, "size": "large"},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]],
+            ["updated", "updated", "error", "error"]
+        )
+        self.assertEqual(Shirt.objects.get(pk=1).size, 30)
+        self.assertEqual(Shirt.objects.get(pk=1).name, "name test")
+        self.assertEqual(Shirt.objects.get(pk=2).name, "renamed")
+        self.assertEqual(Shirt.objects.get(pk=2).size, 22)
+
+    def test_bulk_delete_shirts(self):
+        self.login_client('admin', 'testing')
+        response = self.bulk("delete", [1, 1000])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["deleted", "error"])
+        self.assertFalse(Shirt.objects.filter(pk=1).exists())
+        self.assertTrue(Shirt.objects.filter(pk=2).exists())
+
+    def test_bulk_out_of_range_ids(self):
+        """
+        This test ensures that an id the database cannot bind only fails its
+        own item
+        """
+        self.login_client('admin', 'testing')
+        response = self.bulk("patch", [{"id": 99999999999999999999, "size": 1}, {"id": 1, "size": 30}])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["results"][0]["errors"], {"id": ["A valid integer is required."]})
+        self.assertEqual(response.data["results"][1]["status"], "updated")
+
+        response = self.bulk("delete", [99999999999999999999, 2])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["error", "deleted"])
+        self.assertFalse(Shirt.objects.filter(pk=2).exists())
+
+
+class FilterShirtTest(BaseViewTest):
+
+    def filter_shirts(self, **params):
+        return self.client.get(
+            reverse("create-list-shirt", kwargs={"version": "v1"}),
+            data=params
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.add_shirt(name="polo", email="email1@test.com", size=30)
+        self.add_shirt(name="Polo", email="email3@test.com", size=40)
+        self.login_client('admin', 'testing')
+
+    def assertFiltered(self, params, expected_ids):
+        response = self.filter_shirts(**params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(s["id"] for s in response.data), expected_ids)
+
+    def test_filter_shirts(self):
+        """
+        This test ensures that shirts can be filtered by email, size
+        range and name prefix
+        """
+        self.assertFiltered({"email": "email1@test.com"}, [1, 3])
+        self.assertFiltered({"email": "email1@test.com", "size": 30}, [3])
+        self.assertFiltered({"size_min": 22}, [2, 3, 4])
+        self.assertFiltered({"size_min": 21, "size_max": 30}, [2, 3])
+        self.assertFiltered({"name": "name test"}, [1, 2])
+        self.assertFiltered({"name": "pol"}, [3])
+        self.assertFiltered({"name": "P"}, [4])
+
+    def test_name_prefix_of_last_code_point(self):
+        """
+        This test ensures that a name prefix ending in U+10FFFF, which has no
+        successor, is filtered without an upper bound
+        """
+        self.add_shirt(name="\U0010ffff\U0010ffffshirt", email="email5@test.com", size=50)
+        self.add_shirt(name="p\U0010ffff", email="email6@test.com", size=50)
+        self.assertFiltered({"name": "\U0010ffff"}, [5])
+        self.assertFiltered({"name": "p\U0010ffff"}, [6])
+        self.assertEqual(prefix_upper_bound("p\U0010ffff"), "q")
+        self.assertIsNone(prefix_upper_bound("\U0010ffff"))
+
+        self.add_shirt(name="\ud7ffshirt", email="email7@test.com", size=50)
+        self.add_shirt(name="\ue000shirt", email="email8@test.com", size=50)
+        self.assertFiltered({"name": "\ud7ff"}, [7])
+        self.assertEqual(prefix_upper_bound("\ud7ff"), "\ue000")
+
+    def test_invalid_filter(self):
+        response = self.filter_shirts(size_min="large")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("size_min", response.data)
+
+    def test_out_of_range_filter(self):
+        """
+        This test ensures that sizes the database cannot bind are rejected as
+        invalid instead of failing in the driver
+        """
+        for value in ("99999999999999999999", "-99999999999999999999"):
+            response = self.filter_shirts(size=value)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["size"], ["A valid integer is required."])
+
+    def assertUsesIndex(self, params, index):
+        plan = filter_shirts(Shirt.objects.all(), params).explain()
+        self.assertIn(index, plan)
+
+    def test_filters_use_indexes(self):
+        """
+        This test ensures that every filter is answered with an index
+        seek rather than a full table scan
+        """
+        self.assertUsesIndex({"email": "email1@test.com"}, "shirt_email_size_idx")
+        self.assertUsesIndex({"email": "email1@test.com", "size_min": 20}, "shirt_email_size_idx")
+        self.assertUsesIndex({"size_min": 20, "size_max": 30}, "shirt_size_idx")
+        self.assertUsesIndex({"name": "name"}, "shirt_name_idx")
+
+
+class CachedShirtDetailsTest(BaseViewTest):
+
+    def test_shirt_details_are_cached(self):
+        """
+        This test ensures that shirt details are served from the cache
+        until the shirt is updated or deleted
+        """
+        self.login_client('admin', 'testing')
+        response = self.get_shirt_details(1)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        response = self.get_shirt_details(1)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["name"], "name test")
+
+        self.update_shirt(version="v1", id=1, data=json.dumps({"name": "updated"}))
+        response = self.get_shirt_details(1)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["name"], "updated")
+
+        self.delete_shirt(1)
+        response = self.get_shirt_details(1)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_update_invalidates_cache(self):
+        self.login_client('admin', 'testing')
+        self.get_shirt_details(2)
+        self.client.patch(
+            reverse("bulk-shirt", kwargs={"version": "v1"}),
+            data=json.dumps([{"id": 2, "size": 40}]),
+            content_type='application/json',
+        )
+        response = self.get_shirt_details(2)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["size"], 40)
+
+    def test_cache_stats(self):
+        self.login_client('admin', 'testing')
+        detail_cache.stats.reset()
+        self.get_shirt_details(1)
+        self.get_shirt_details(1)
+        response = self.client.get(reverse("cache-stats"))
+        self.assertEqual(response.data["shirt.shirt"], {"hits": 1, "misses": 1})
+
+
+class ConditionalShirtTest(BaseViewTest):
+
+    def test_shirt_list_etag(self):
+        """
+        This test ensures that an unchanged shirt list is answered with
+        304 Not Modified and that any write changes its ETag
+        """
+        self.login_client('admin', 'testing')
+        url = reverse("create-list-shirt", kwargs={"version": "v1"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, {"email": "email1@test.com"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Shirt.objects.get(pk=2).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_shirt_list_validators_track_table_version(self):
+        """
+        This test ensures that list validators come from the table version
+        row, without reading the shirts, and that every write path, including
+        those sending no signals, replaces them
+        """
+        self.login_client('admin', 'testing')
+        url = reverse("create-list-shirt", kwargs={"version": "v2"})
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse([q for q in queries if 'FROM "shirt_shirt"' in q["sql"]])
+
+        Shirt.objects.filter(pk=1).update(size=99)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        self.client.post(reverse("bulk-shirt", kwargs={"version": "v1"}),
+                         data=json.dumps([{"name": "bulk", "email": "bulk@test.com", "size": 1}]),
+                         content_type='application/json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_shirt_details_etag(self):
+        self.login_client('admin', 'testing')
+        response = self.get_shirt_details(1)
+        etag = response["ETag"]
+
+        response = self.client.get(
+            reverse("details-update-delete-shirt", kwargs={"version": "v1", "pk": 1}),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_shirt_if_match(self):
+        """
+        This test ensures that an update based on a stale copy of the
+        shirt is rejected with 412 Precondition Failed
+        """
+        self.login_client('admin', 'testing')
+        etag = self.get_shirt_details(1)["ETag"]
+        url = reverse("details-update-delete-shirt", kwargs={"version": "v1", "pk": 1})
+
+        response = self.client.put(url, data=json.dumps({"name": "first"}),
+                                   content_type='application/json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.put(url, data=json.dumps({"name": "second"}),
+                                   content_type='application/json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Shirt.objects.get(pk=1).name, "first")
+
+    def test_update_shirt_if_match_uncached_write(self):
+        """
+        This test ensures that If-Match is checked against the database, so
+        that a write the cache did not see (another worker) is not overwritten
+        """
+        self.login_client('admin', 'testing')
+        etag = self.get_shirt_details(1)["ETag"]
+        Shirt.objects.filter(pk=1).update(name="elsewhere", updated_at=timezone.now())
+
+        response = self.client.put(reverse("details-update-delete-shirt", kwargs={"version": "v1", "pk": 1}),
+                                   data=json.dumps({"name": "stale"}), content_type='application/json',
+                                   HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Shirt.objects.get(pk=1).name, "elsewhere")
+
+    def test_update_shirt_if_match_race(self):
+        """
+        This test ensures that a write landing between the precondition check
+        and the UPDATE is not overwritten
+        """
+        self.login_client('admin', 'testing')
+        etag = self.get_shirt_details(1)["ETag"]
+
+        def racing_update_returning(queryset, values):
+            Shirt.objects.filter(pk=1).update(name="racer", updated_at=timezone.now())
+            return update_returning(queryset, values)
+
+        with mock.patch('shirt.views.update_returning', racing_update_returning), \
+                mock.patch.object(orm, 'update_returning', racing_update_returning):
+            response = self.client.put(reverse("details-update-delete-shirt", kwargs={"version": "v1", "pk": 1}),
+                                       data=json.dumps({"name": "loser"}), content_type='application/json',
+                                       HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Shirt.objects.get(pk=1).name, "racer")
+
+
+class SingleQueryUpdateShirtTest(BaseViewTest):
+
+    def test_update_returning(self):
+        """
+        This test ensures that an update writes and reads back the row
+        with a single query
+        """
+        before = Shirt.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            shirts = update_returning(Shirt.objects.filter(pk=1), {"size": 42})
+
+        self.assertEqual(len(shirts), 1)
+        self.assertEqual(shirts[0].size, 42)
+        self.assertEqual(shirts[0].name, before.name)
+        self.assertEqual(shirts[0].updated_at, Shirt.objects.get(pk=1).updated_at)
+        self.assertEqual(update_returning(Shirt.objects.filter(pk=1000), {"size": 42}), [])
+
+    def test_update_shirt_validates_input(self):
+        self.login_client('admin', 'testing')
+        response = self.update_shirt(version="v1", id=1, data=json.dumps({"size": "large"}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("size", response.data)
+        self.assertEqual(Shirt.objects.get(pk=1).size, 20)
+
+    def test_update_shirt_bumps_updated_at(self):
+        self.login_client('admin', 'testing')
+        before = Shirt.objects.get(pk=1).updated_at
+        response = self.update_shirt(version="v1", id=1, data=json.dumps({"size": 21}))
+        self.assertEqual(response.data["size"], 21)
+        self.assertGreater(Shirt.objects.get(pk=1).updated_at, before)
+
+
+class CachedAuthenticationShirtTest(BaseViewTest):
+
+    def test_shirt_requests_skip_user_query(self):
+        """
+        This test ensures that once a token's user is cached, shirt
+        requests do not query the user table
+        """
+        self.login_client('admin', 'testing')
+        self.add_shirt(name="auth", email="auth@test.com", size=30)
+        url = reverse("create-list-shirt", kwargs={"version": "v1"})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries if User._meta.db_table in q['sql']])
+
+
+class QueryBudgetShirtTest(BaseViewTest):
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        """
+        This test ensures that listing shirts takes the same number of
+        queries however many shirts there are
+        """
+        self.login_client('admin', 'testing')
+        for version, params in (("v1", {}), ("v2", {"page_size": 100})):
+            url = reverse("create-list-shirt", kwargs={"version": version})
+            self.count_queries(url, **params)
+            before = self.count_queries(url, **params)
+            Shirt.objects.bulk_create(
+                [Shirt(name="budget", email="budget@test.com", size=i) for i in range(1, 50)])
+            self.assertEqual(self.count_queries(url, **params), before)
+
+    def test_query_budgets(self):
+        """
+        This test ensures that the shirt endpoints stay within the query
+        budgets of benchmarks/routes.py
+        """
+        self.login_client('admin', 'testing')
+        self.count_queries(reverse("create-list-shirt", kwargs={"version": "v1"}))
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse("create-list-shirt", kwargs={"version": "v2"}))
+        with self.assertNumQueries(2):
+            self.get_shirt_details(1)
+        with self.assertNumQueries(1):
+            self.update_shirt(version="v1", id=1, data=json.dumps({"size": 30}))
+        with self.assertNumQueries(1):
+            self.add_a_shirt(version="v1", data=json.dumps({"name": "new", "email": "new@test.com", "size": 30}))
+
+
+class FastListShirtTest(BaseViewTest):
+
+    def test_fast_list_is_byte_identical(self):
+        """
+        This test ensures that the values_list() path renders exactly the
+        bytes of the ShirtSerializer path
+        """
+        self.login_client('admin', 'testing')
+        self.add_shirt(name="unicode \u00e9\u2028\u2029 \U0001f455", email="\"quoted\"@test.com", size=0)
+        for version, params in (("v1", {}), ("v2", {"page_size": 2}), ("v2", {"size_min": 21})):
+            url = reverse("create-list-shirt", kwargs={"version": version})
+            fast = self.client.get(url, data=params)
+            with mock.patch.object(RowSerializer, "compile", return_value=None):
+                slow = self.client.get(url, data=params)
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+
+class SparseFieldsShirtTest(BaseViewTest):
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data=params)
+        return response, [q["sql"] for q in queries if '"shirt_shirt"."name"' in q["sql"] or '"shirt_shirt"."email"' in q["sql"]]
+
+    def test_list_fields(self):
+        """
+        This test ensures that ?fields= limits the listed fields and the
+        selected columns
+        """
+        self.login_client('admin', 'testing')
+        for version in ("v1", "v2"):
+            response, queries = self.get(reverse("create-list-shirt", kwargs={"version": version}), fields="id,size")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results = response.data if version == "v1" else response.data["results"]
+            self.assertEqual(results, [{"id": 1, "size": 20}, {"id": 2, "size": 22}])
+            self.assertEqual(queries, [])
+
+    def test_paginated_fields_without_id(self):
+        """
+        This test ensures that cursor pages can leave out the id, which
+        the paginator still orders by
+        """
+        self.login_client('admin', 'testing')
+        self.add_shirt(name="name test 2", email="email3@test.com", size=24)
+        url = reverse("create-list-shirt", kwargs={"version": "v2"})
+        response = self.client.get(url, data={"fields": "name", "page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"name": "name test"}, {"name": "name test 1"}])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"], [{"name": "name test 2"}])
+        with mock.patch.object(RowSerializer, "compile", return_value=None):
+            response = self.client.get(url, data={"fields": "name", "page_size": 2})
+        self.assertEqual(response.data["results"], [{"name": "name test"}, {"name": "name test 1"}])
+
+    def test_detail_fields(self):
+        """
+        This test ensures that ?fields= works for details, on a cache miss
+        as well as on a hit
+        """
+        self.login_client('admin', 'testing')
+        url = reverse("details-update-delete-shirt", kwargs={"version": "v1", "pk": 1})
+        response, queries = self.get(url, fields="size,id")
+        self.assertEqual(response.data, {"id": 1, "size": 20})
+        self.assertEqual(queries, [])
+
+        self.get_shirt_details(1)
+        response, queries = self.get(url, fields="name")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data, {"name": "name test"})
+
+    def test_default_projection(self):
+        self.login_client('admin', 'testing')
+        with CaptureQueriesContext(connection) as queries:
+            self.get_shirt_details(1)
+        self.assertFalse([q for q in queries if "updated_at" in q["sql"] and '"name"' in q["sql"]])
+
+    def test_unknown_field(self):
+        self.login_client('admin', 'testing')
+        response = self.client.get(reverse("create-list-shirt", kwargs={"version": "v1"}), data={"fields": "id,owner"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("owner", response.data["fields"][0])
+
+
+class BatchShirtTest(BaseViewTest):
+
+    def get_batch(self, ids, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("batch-shirt", kwargs={"version": "v1"}), data=dict(params, ids=ids))
+        return response, [q["sql"] for q in queries if '"shirt_shirt"' in q["sql"]]
+
+    def test_batch_order_and_missing(self):
+        """
+        This test ensures that a batch keeps the requested order, reports
+        the missing ids and reads the shirts with one query
+        """
+        self.login_client('admin', 'testing')
+        response, queries = self.get_batch("2,99,1,2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], ShirtSerializer(Shirt.objects.order_by("-pk"), many=True).data)
+        self.assertEqual(response.data["missing"], [99])
+        self.assertEqual(len(queries), 1)
+
+    def test_batch_uses_detail_cache(self):
+        """
+        This test ensures that only the shirts missing from the detail
+        cache are read from the database
+        """
+        self.login_client('admin', 'testing')
+        self.get_shirt_details(1)
+        response, queries = self.get_batch("1,2")
+        self.assertEqual([shirt["id"] for shirt in response.data["results"]], [1, 2])
+        self.assertEqual(len(queries), 1)
+        self.assertIn("IN (2)", queries[0])
+
+        response, queries = self.get_batch("2,1")
+        self.assertEqual([shirt["id"] for shirt in response.data["results"]], [2, 1])
+        self.assertEqual(queries, [])
+        self.assertEqual(self.get_shirt_details(2)["X-Cache"], "HIT")
+
+        self.update_shirt(version="v1", id=2, data=json.dumps({"name": "updated"}))
+        response, queries = self.get_batch("2,1")
+        self.assertEqual(response.data["results"][0]["name"], "updated")
+        self.assertEqual(len(queries), 1)
+
+    def test_batch_fields(self):
+        self.login_client('admin', 'testing')
+        self.get_shirt_details(1)
+        response, _ = self.get_batch("1,2", fields="id,size")
+        self.assertEqual(response.data["results"], [{"id": 1, "size": 20}, {"id": 2, "size": 22}])
+
+    def test_batch_invalid_ids(self):
+        self.login_client('admin', 'testing')
+        for ids in ("", "1,abc", "1,99999999999999999999", ",".join(str(pk) for pk in range(1, 102))):
+            response, _ = self.get_batch(ids)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("ids", response.data)
+
+    def test_batch_requires_authentication(self):
+        response, _ = self.get_batch("1")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ShirtStatsTest(BaseViewTest):
+
+    def get_stats(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("stats-shirt", kwargs={"version": "v1"}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([q for q in queries if "shirt_shirt" in q["sql"]]), 1)
+        return response.data
+
+    def assertStatsMatchShirts(self):
+        shirts = Shirt.objects.all()
+        stats = self.get_stats()
+        self.assertEqual(stats["total"], shirts.count())
+        self.assertEqual(stats["size"], [
+            {"size": size, "count": shirts.filter(size=size).count()}
+            for size in sorted(set(shirts.values_list("size", flat=True)))
+        ])
+        domains = {}
+        for email in shirts.values_list("email", flat=True):
+            domain = email.partition("@")[2].lower()
+            domains[domain] = domains.get(domain, 0) + 1
+        self.assertEqual({item["email_domain"]: item["count"] for item in stats["email_domain"]}, domains)
+        return stats
+
+    def test_stats(self):
+        """
+        This test ensures that the stats count the shirts per size and per
+        email domain
+        """
+        self.login_client('admin', 'testing')
+        self.add_shirt(name="other", email="someone@Other.org", size=20)
+        self.assertEqual(self.assertStatsMatchShirts(), {
+            "total": 3,
+            "size": [{"size": 20, "count": 2}, {"size": 22, "count": 1}],
+            "email_domain": [{"email_domain": "test.com", "count": 2}, {"email_domain": "other.org", "count": 1}],
+        })
+
+    def test_stats_follow_writes(self):
+        """
+        This test ensures that the stats follow creates, updates and
+        deletes, single and bulk
+        """
+        self.login_client('admin', 'testing')
+        self.add_a_shirt(version="v1", data=json.dumps({"name": "new", "email": "new@new.com", "size": 30}))
+        self.assertStatsMatchShirts()
+        self.update_shirt(version="v1", id=1, data=json.dumps({"size": 30, "email": "moved@new.com"}))
+        self.assertStatsMatchShirts()
+        self.delete_shirt(2)
+        self.assertStatsMatchShirts()
+
+        url = reverse("bulk-shirt", kwargs={"version": "v1"})
+        self.client.post(url, data=json.dumps(
+            [{"name": "bulk", "email": "bulk{}@bulk.com".format(i), "size": i % 3 + 1} for i in range(10)]),
+            content_type='application/json')
+        self.assertStatsMatchShirts()
+        self.client.patch(url, data=json.dumps([{"id": 1, "size": 1}, {"id": 4, "email": "b@new.com"}]),
+                          content_type='application/json')
+        self.assertStatsMatchShirts()
+        self.client.delete(url, data=json.dumps([1, 4, 5]), content_type='application/json')
+        self.assertStatsMatchShirts()
+        Shirt.objects.filter(size=1).update(size=2)
+        self.assertStatsMatchShirts()
+
+    def test_rebuild_command(self):
+        """
+        This test ensures that rebuild_shirt_stats repairs drifted stats
+        """
+        ShirtStat.objects.filter(bucket="20").update(count=5)
+        ShirtStat.objects.create(dimension=ShirtStat.SIZE, bucket="99", count=1)
+        out = io.StringIO()
+        call_command("rebuild_shirt_stats", stdout=out)
+        self.assertIn("3 shirt stat buckets, 2 had drifted", out.getvalue())
+        self.login_client('admin', 'testing')
+        self.assertStatsMatchShirts()
+
+    def test_stats_require_authentication(self):
+        response = self.client.get(reverse("stats-shirt", kwargs={"version": "v1"}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SearchShirtTest(BaseViewTest):
+
+    def search(self, **params):
+        response = self.client.get(reverse("search-shirt", kwargs={"version": "v1"}), data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def names(self, **params):
+        return [shirt["name"] for shirt in self.search(**params)["results"]]
+
+    def setUp(self):
+        super().setUp()
+        self.add_shirt(name="red dragon", email="fire@dragons.org", size=30)
+        self.add_shirt(name="blue whale", email="dragonfly@ocean.org", size=40)
+        self.login_client('admin', 'testing')
+
+    def test_prefix_and_rank(self):
+        """
+        This test ensures that search terms match word prefixes and that
+        name matches rank before email matches
+        """
+        self.assertEqual(self.names(q="drag"), ["red dragon", "blue whale"])
+        self.assertEqual(self.names(q="DRAGON red"), ["red dragon"])
+        self.assertEqual(self.names(q="ocean.org"), ["blue whale"])
+        self.assertEqual(self.names(q="agon"), [])
+
+    def test_index_follows_writes(self):
+        """
+        This test ensures that the search index follows creates, updates and
+        deletes, single and bulk
+        """
+        self.update_shirt(version="v1", id=3, data=json.dumps({"name": "green lizard"}))
+        self.assertEqual(self.names(q="lizard"), ["green lizard"])
+        self.assertEqual(self.names(q="red"), [])
+
+        url = reverse("bulk-shirt", kwargs={"version": "v1"})
+        self.client.post(url, data=json.dumps([{"name": "lizard king", "email": "k@k.com", "size": 1}]),
+                         content_type='application/json')
+        self.client.patch(url, data=json.dumps([{"id": 4, "name": "lizard whale"}]), content_type='application/json')
+        self.assertEqual(sorted(self.names(q="lizard")), ["green lizard", "lizard king", "lizard whale"])
+
+        self.delete_shirt(3)
+        self.client.delete(url, data=json.dumps([4]), content_type='application/json')
+        self.assertEqual(self.names(q="lizard"), ["lizard king"])
+
+    def test_pagination(self):
+        for i in range(5):
+            self.add_shirt(name="page {}".format(i), email="page@test.com", size=i + 1)
+        data = self.search(q="page", limit=2, offset=2)
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIn("offset=4", data["next"])
+
+    def test_broad_queries_are_not_ranked(self):
+        """
+        This test ensures that queries matching more than SEARCH_RANK_LIMIT
+        shirts are returned in id order
+        """
+        self.add_shirt(name="dragon", email="d@d.com", size=1)
+        self.assertEqual(self.names(q="dragon"), ["red dragon", "dragon", "blue whale"])
+        with override_settings(SEARCH_RANK_LIMIT=2):
+            self.assertEqual(self.names(q="dragon"), ["red dragon", "blue whale", "dragon"])
+
+    def test_icontains_engine(self):
+        with override_settings(SEARCH_ENGINE='api.search.IcontainsEngine'):
+            self.assertEqual(self.names(q="drag"), ["red dragon", "blue whale"])
+            self.assertEqual(self.names(q="agon whale"), ["blue whale"])
+
+    def test_search_fields(self):
+        self.assertEqual(self.search(q="dragon", fields="id,size")["results"],
+                         [{"id": 3, "size": 30}, {"id": 4, "size": 40}])
+
+    def test_query_required(self):
+        for q in ("", "  *** "):
+            response = self.client.get(reverse("search-shirt", kwargs={"version": "v1"}), data={"q": q})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("q", response.data)
+
+
+# the same tests against the async shirt views, served by api.async_urls under ASGI
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncGetAllShirtTest(GetAllShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncGetShirtDetailsTest(GetShirtDetailsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncAddShirtTest(AddShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncUpdateShirtTest(UpdateShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncDeleteShirtTest(DeleteShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncPaginateShirtTest(PaginateShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncFilterShirtTest(FilterShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncCachedShirtDetailsTest(CachedShirtDetailsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncConditionalShirtTest(ConditionalShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSingleQueryUpdateShirtTest(SingleQueryUpdateShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncCachedAuthenticationShirtTest(CachedAuthenticationShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncQueryBudgetShirtTest(QueryBudgetShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncFastListShirtTest(FastListShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSparseFieldsShirtTest(SparseFieldsShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncBatchShirtTest(BatchShirtTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncShirtStatsTest(ShirtStatsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSearchShirtTest(SearchShirtTest):
+    pass
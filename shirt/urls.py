@@ -1,8 +1,14 @@
 from django.urls import path
 
-from shirt.views import CreateListShirtView, ShirtDetailsUpdateDeleteView
+from shirt.views import (BatchShirtView, BulkShirtView, CreateListShirtView, ExportShirtView, ShirtDetailsUpdateDeleteView,
+                         SearchShirtView, ShirtStatsView)
 
 urlpatterns = [
     path("", CreateListShirtView.as_view(), name="create-list-shirt"),
+    path("bulk", BulkShirtView.as_view(), name="bulk-shirt"),
+    path("batch", BatchShirtView.as_view(), name="batch-shirt"),
+    path("search", SearchShirtView.as_view(), name="search-shirt"),
+    path("stats", ShirtStatsView.as_view(), name="stats-shirt"),
+    path("export", ExportShirtView.as_view(), name="export-shirt"),
     path("<str:pk>", ShirtDetailsUpdateDeleteView.as_view(), name="details-update-delete-shirt"),
 ]
@@ -1,31 +1,196 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import generics, status
 
 # Create your views here.
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.batch import BatchRetrieveMixin
+from api.bulk import BulkMixin
+from api.cache import CachedRetrieveMixin, get_lookup_pk
+from api.conditional import (ConditionalGetMixin, ListValidatorsMixin, ObjectValidatorsMixin, conditional,
+                             precondition_failed)
+from api.export import ndjson_response
+from api.fast import FastListMixin
+from api.orm import in_integer_range, send_post_save, update_returning
+from api.pagination import IdCursorPagination, SearchPagination, VersionedPaginationMixin
+from api.search import SearchFilter
+from api.sparse import SparseFieldsMixin
+from shirt.filters import ShirtFilterBackend
 from shirt.models import Shirt
 from shirt.serializers import ShirtSerializer
+from shirt.stats import stats_queryset, summarize
 
 
-class CreateListShirtView(generics.ListCreateAPIView):
+class CreateListShirtView(SparseFieldsMixin, ConditionalGetMixin, ListValidatorsMixin, VersionedPaginationMixin,
+                          FastListMixin, generics.ListCreateAPIView):
     queryset = Shirt.objects.all()
     serializer_class = ShirtSerializer
+    pagination_class = IdCursorPagination
+    filter_backends = [ShirtFilterBackend]
 
 
-class ShirtDetailsUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class ExportShirtView(generics.GenericAPIView):
+    """
+    Stream every shirt as newline-delimited JSON
+    """
+    queryset = Shirt.objects.order_by('pk')
+    serializer_class = ShirtSerializer
+    filter_backends = [ShirtFilterBackend]
+
+    def get(self, request, *args, **kwargs):
+        return ndjson_response(
+            self.filter_queryset(self.get_queryset()),
+            ShirtSerializer.Meta.fields,
+            filename='shirts.ndjson'
+        )
+
+
+class BulkShirtView(BulkMixin, generics.GenericAPIView):
+    """
+    Create, update or delete many shirts in one request and one transaction.
+    Every item gets its own result, so invalid items are reported while the
+    valid ones are still written.
+    """
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+
+    @staticmethod
+    def get_ids(items, errors):
+        ids, seen = {}, set()
+        for index, item in enumerate(items):
+            try:
+                pk = int(item["id"] if isinstance(item, dict) else item)
+            except (KeyError, TypeError, ValueError):
+                pk = None
+            if pk is None or not in_integer_range(pk, Shirt._meta.pk):
+                errors[index] = {"id": ["A valid integer is required."]}
+                continue
+            if pk in seen:
+                errors[index] = {"id": ["Duplicate id: {}".format(pk)]}
+                continue
+            seen.add(pk)
+            ids[index] = pk
+        return ids
+
+    @staticmethod
+    def not_found(pk):
+        return {"id": ["Shirt with id: {} does not exist".format(pk)]}
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        serializer = self.get_serializer(many=True)
+        validated, errors = serializer.validate_items(dict(enumerate(items)))
+
+        with transaction.atomic():
+            shirts = serializer.create(list(validated.values()))
+
+        results = {
+            index: {"index": index, "status": "created", "data": ShirtSerializer(shirt).data}
+            for index, shirt in zip(validated, shirts)
+        }
+        return self.bulk_response(results, errors, status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        serializer = self.get_serializer(many=True, partial=True)
+        errors = {}
+        ids = self.get_ids(items, errors)
+
+        with transaction.atomic():
+            shirts = self.get_queryset().select_for_update().in_bulk(ids.values())
+            for index, pk in list(ids.items()):
+                if pk not in shirts:
+                    errors[index] = self.not_found(pk)
+                    del ids[index]
+
+            validated, invalid = serializer.validate_items({index: items[index] for index in ids})
+            errors.update(invalid)
+            instances = [shirts[ids[index]] for index in validated]
+            serializer.update(instances, list(validated.values()))
+
+        results = {
+            index: {"index": index, "status": "updated", "data": ShirtSerializer(shirt).data}
+            for index, shirt in zip(validated, instances)
+        }
+        return self.bulk_response(results, errors, status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        errors = {}
+        ids = self.get_ids(items, errors)
+
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(pk__in=ids.values())
+            existing = set(queryset.values_list("pk", flat=True))
+            queryset.delete()
+
+        results = {}
+        for index, pk in ids.items():
+            if pk in existing:
+                results[index] = {"index": index, "status": "deleted", "data": {"id": pk}}
+            else:
+                errors[index] = self.not_found(pk)
+        return self.bulk_response(results, errors, status.HTTP_200_OK)
+
+
+class SearchShirtView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    Full-text search of shirts by name and email with ``?q=``, best matches first
+    """
     queryset = Shirt.objects.all()
     serializer_class = ShirtSerializer
+    filter_backends = [SearchFilter]
+    pagination_class = SearchPagination
+    search_fields = ('name', 'email')
+
+
+class ShirtStatsView(APIView):
+    """
+    Shirt counts per size and per email domain, read from the ShirtStat buckets
+    """
 
+    def get(self, request, *args, **kwargs):
+        return Response(summarize(list(stats_queryset())))
+
+
+class BatchShirtView(SparseFieldsMixin, BatchRetrieveMixin, generics.GenericAPIView):
+    """
+    Retrieve many shirts by id with ``?ids=1,5,9``
+    """
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+
+    def get(self, request, *args, **kwargs):
+        return self.batch_retrieve(request, *args, **kwargs)
+
+
+class ShirtDetailsUpdateDeleteView(SparseFieldsMixin, ConditionalGetMixin, ObjectValidatorsMixin, CachedRetrieveMixin,
+                                   generics.RetrieveUpdateDestroyAPIView):
+    queryset = Shirt.objects.all()
+    serializer_class = ShirtSerializer
+
+    @conditional
     def put(self, request, *args, **kwargs):
-        try:
-            shirt = self.queryset.get(pk=kwargs["pk"])
-            serializer = ShirtSerializer()
-            updated_shirt = serializer.update(shirt, request.data)
-            return Response(ShirtSerializer(updated_shirt).data)
-        except Shirt.DoesNotExist:
+        serializer = ShirtSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        # a single UPDATE of the submitted columns which also returns the row
+        pk = get_lookup_pk(self)
+        values = dict(serializer.validated_data, updated_at=timezone.now())
+        queryset = self.precondition_queryset(self.get_queryset().filter(pk=pk))
+        shirts = update_returning(queryset, values) if pk is not None else []
+        if not shirts:
+            if self.matched_last_modified is not None:
+                # changed since the preconditions were checked
+                return precondition_failed()
             return Response(
                 data={
                     "message": "Shirt with id: {} does not exist".format(kwargs["pk"])
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        send_post_save(shirts[0], values)
+        return Response(ShirtSerializer(shirts[0]).data)
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from user.async_views import (AsyncUserRegisterView, AsyncUserListView, AsyncUserDetailsView, AsyncUserBatchView,
+                              AsyncUserExportView, AsyncUserSearchView, AsyncUserUpdateView)
+from user.views import UserBulkRegisterView
+
+urlpatterns = [
+    path("", AsyncUserRegisterView.as_view(), name="user-register"),
+    path("bulk", UserBulkRegisterView.as_view(), name="user-bulk-register"),
+    path("list", AsyncUserListView.as_view(), name="user-list"),
+    path("batch", AsyncUserBatchView.as_view(), name="user-batch"),
+    path("search", AsyncUserSearchView.as_view(), name="user-search"),
+    path("export", AsyncUserExportView.as_view(), name="user-export"),
+    path("<str:pk>/details", AsyncUserDetailsView.as_view(), name="user-details"),
+    path("<str:pk>/update", AsyncUserUpdateView.as_view(), name="user-update"),
+]
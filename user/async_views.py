@@ -0,0 +1,166 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from api.async_views import AsyncCreateModelMixin, AsyncGenericAPIView, AsyncListModelMixin, AsyncRetrieveModelMixin
+from api.batch import BatchRetrieveMixin
+from api.cache import CachedRetrieveMixin, get_lookup_pk
+from api.conditional import ListValidatorsMixin, ObjectValidatorsMixin, aconditional, precondition_failed
+from api.export import file_url, ndjson_response
+from api.fast import FastListMixin
+from api.orm import aupdate_returning, save_file
+from api.pagination import SearchPagination
+from api.search import SearchFilter
+from api.sparse import SparseFieldsMixin
+
+from user.serializers import UserSerializer, UserWithoutPasswordSerializer, UserUpdatableFieldSerializer, variant_urls
+from user.thumbnails import schedule_profile_picture_variants
+
+User = get_user_model()
+
+
+class AsyncUserRegisterView(AsyncCreateModelMixin, AsyncGenericAPIView):
+    """
+    Register new user
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserSerializer
+
+    async def post(self, request, *args, **kwargs):
+        return await self.acreate(request, *args, **kwargs)
+
+    async def aperform_create(self, serializer):
+        await super().aperform_create(serializer)
+        await sync_to_async(schedule_profile_picture_variants)(serializer.instance)
+
+
+class AsyncUserListView(SparseFieldsMixin, ListValidatorsMixin, FastListMixin, AsyncListModelMixin,
+                        AsyncGenericAPIView):
+    """
+    Get active user lists
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    @aconditional
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+
+class AsyncUserSearchView(SparseFieldsMixin, AsyncListModelMixin, AsyncGenericAPIView):
+    """
+    Full-text search of active users by username, first and last name and email
+    with ``?q=``, best matches first
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+    filter_backends = [SearchFilter]
+    pagination_class = SearchPagination
+    search_fields = ('username', 'first_name', 'last_name', 'email')
+
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+
+class AsyncUserExportView(AsyncGenericAPIView):
+    """
+    Stream active users as newline-delimited JSON from an async iterator
+    """
+    queryset = User.objects.all().filter(is_active=True).order_by('pk')
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    async def get(self, request, *args, **kwargs):
+        storage = User._meta.get_field('profile_picture').storage
+        return ndjson_response(
+            self.get_queryset(),
+            UserWithoutPasswordSerializer.Meta.fields,
+            transforms={
+                'profile_picture': file_url(request, storage),
+                'profile_picture_variants': lambda variants: variant_urls(variants, request),
+            },
+            filename='users.ndjson',
+            asynchronous=True
+        )
+
+
+class AsyncUserDetailsView(SparseFieldsMixin, ObjectValidatorsMixin, CachedRetrieveMixin, AsyncRetrieveModelMixin,
+                           AsyncGenericAPIView):
+    """
+    Retrieve user details by user_id
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    @aconditional
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+
+class AsyncUserBatchView(SparseFieldsMixin, BatchRetrieveMixin, AsyncGenericAPIView):
+    """
+    Retrieve many active users by user_id with ``?ids=1,5,9``
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    async def get(self, request, *args, **kwargs):
+        return await self.abatch_retrieve(request, *args, **kwargs)
+
+
+class AsyncUserUpdateView(ObjectValidatorsMixin, AsyncGenericAPIView):
+    """
+    Takes first_name, last_name, email, and profile picture then return updated user
+    to update existing user. This operation just could be accessed by admin user or the users themselves.
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    serializer_class = UserUpdatableFieldSerializer
+
+    async def put(self, request, *args, **kwargs):
+
+        # authorize before the preconditions, a 412 would tell whether the user changed
+        if request.user.is_superuser or str(request.user.pk) == kwargs["pk"]:
+            return await self.update_user(request, *args, **kwargs)
+        else:
+            return Response(
+                data={
+                    "message": "Unauthorized"
+                },
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+    @aconditional
+    async def update_user(self, request, *args, **kwargs):
+        serializer = UserUpdatableFieldSerializer(data=request.data, partial=True)
+        await self.avalidate(serializer)
+
+        pk = get_lookup_pk(self)
+        values = dict(serializer.validated_data, updated_at=timezone.now())
+        if values.get('profile_picture'):
+            values['profile_picture'] = await sync_to_async(save_file)(
+                User, 'profile_picture', values['profile_picture'])
+            values['profile_picture_variants'] = {}
+        queryset = self.precondition_queryset(self.get_queryset().filter(pk=pk))
+        users = await aupdate_returning(queryset, values) if pk is not None else []
+        if not users:
+            if self.matched_last_modified is not None:
+                # changed since the preconditions were checked
+                return precondition_failed()
+            # content-hashed files may be shared with other users; prune_profile_pictures collects them
+            return Response(
+                data={
+                    "message": "User with id: {} does not exist".format(kwargs["pk"])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if values.get('profile_picture'):
+            await sync_to_async(schedule_profile_picture_variants)(users[0])
+        return Response(UserWithoutPasswordSerializer(users[0]).data)
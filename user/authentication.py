@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """
+    Process-local LRU cache of user rows keyed by user id, with a short TTL.
+
+    Only the column values are kept; every lookup builds a fresh model instance
+    so that requests never share (and mutate) the same object. Saves and deletes
+    invalidate entries in this process, other processes pick up the change once
+    ``JWT_USER_CACHE_TTL`` has passed.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model, user_id):
+        with self._lock:
+            entry = self._entries.get(str(user_id))
+            if entry is None:
+                return None
+            expires, field_names, values = entry
+            if expires < time.monotonic():
+                del self._entries[str(user_id)]
+                return None
+            self._entries.move_to_end(str(user_id))
+        return model.from_db(None, field_names, values)
+
+    def set(self, user):
+        if settings.JWT_USER_CACHE_TTL <= 0:
+            return
+        fields = user._meta.concrete_fields
+        entry = (
+            time.monotonic() + settings.JWT_USER_CACHE_TTL,
+            [field.attname for field in fields],
+            [getattr(user, field.attname) for field in fields],
+        )
+        with self._lock:
+            self._entries[str(user.pk)] = entry
+            self._entries.move_to_end(str(user.pk))
+            while len(self._entries) > settings.JWT_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """
+        Drop the entry now, and again once the surrounding transaction commits so
+        a concurrent request cannot cache the old row in between.
+        """
+        self._discard(user_id)
+        transaction.on_commit(lambda: self._discard(user_id))
+
+    def _discard(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` which reads the user from ``user_cache``, so requests
+    from a recently seen user do not query the user table. ``aauthenticate()`` is
+    used by the async views.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(self.user_model, user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(self.user_model, user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
@@ -0,0 +1,57 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.models import User
+
+
+def referenced_pictures():
+    """
+    Names of the profile pictures and variants some user refers to
+    """
+    names = set()
+    rows = User.objects.values_list('profile_picture', 'profile_picture_variants').iterator()
+    for picture, variants in rows:
+        if picture:
+            names.add(picture)
+        for formats in (variants or {}).values():
+            names.update(formats.values())
+    return names
+
+
+def stored_files(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name).replace('\\', '/')
+    for subdirectory in directories:
+        yield from stored_files(storage, os.path.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = ('Delete stored profile pictures and variants no user refers to. Uploads are content-hashed and shared '
+            'between users, so request paths never delete them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='only delete files older than this many seconds, to spare uploads in flight')
+        parser.add_argument('--dry-run', action='store_true', help='list the files without deleting them')
+
+    def handle(self, *args, **options):
+        field = User._meta.get_field('profile_picture')
+        storage = field.storage
+        if not storage.exists(field.upload_to):
+            return
+        # list the files before reading the references, so a file saved in between is referenced or too recent
+        files = list(stored_files(storage, field.upload_to))
+        referenced = referenced_pictures()
+        cutoff = time.time() - options['min_age']
+        deleted = 0
+        for name in files:
+            if name in referenced or storage.get_modified_time(name).timestamp() > cutoff:
+                continue
+            if not options['dry_run']:
+                storage.delete(name)
+            deleted += 1
+            self.stdout.write(name)
+        self.stdout.write('{} {} unreferenced file(s)'.format('Found' if options['dry_run'] else 'Deleted', deleted))
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# SQLite FTS5 index of user_user, an external content table kept in step by triggers
+CREATE_INDEX = [
+    "CREATE VIRTUAL TABLE user_user_search USING fts5(username, first_name, last_name, email,"
+    " content='user_user', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    """
+    CREATE TRIGGER user_user_search_insert AFTER INSERT ON user_user BEGIN
+        INSERT INTO user_user_search(rowid, username, first_name, last_name, email)
+            VALUES (new.id, new.username, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER user_user_search_delete AFTER DELETE ON user_user BEGIN
+        INSERT INTO user_user_search(user_user_search, rowid, username, first_name, last_name, email)
+            VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER user_user_search_update AFTER UPDATE OF username, first_name, last_name, email ON user_user
+    WHEN old.username IS NOT new.username
+        OR old.first_name IS NOT new.first_name
+        OR old.last_name IS NOT new.last_name
+        OR old.email IS NOT new.email BEGIN
+        INSERT INTO user_user_search(user_user_search, rowid, username, first_name, last_name, email)
+            VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.email);
+        INSERT INTO user_user_search(rowid, username, first_name, last_name, email)
+            VALUES (new.id, new.username, new.first_name, new.last_name, new.email);
+    END
+    """,
+    "INSERT INTO user_user_search(user_user_search) VALUES ('rebuild')",
+    "INSERT INTO user_user_search(user_user_search, rank) VALUES ('rank', 'bm25(4.0, 2.0, 2.0, 1.0)')",
+]
+
+DROP_INDEX = [
+    'DROP TRIGGER user_user_search_insert',
+    'DROP TRIGGER user_user_search_delete',
+    'DROP TRIGGER user_user_search_update',
+    'DROP TABLE user_user_search',
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_INDEX:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_alter_user_first_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:30
+
+from django.db import migrations
+from django.utils import timezone
+
+# Bump the api_tableversion row of user_user on every write, see api.models.TableVersion.
+# strftime() is passed through unformatted, hence execute(statement, None).
+SQLITE_BUMP = (
+    "UPDATE api_tableversion SET version = version + 1, changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now') "
+    "WHERE table_name = 'user_user';"
+)
+TRIGGERS = {
+    'sqlite': (
+        [
+            "CREATE TRIGGER user_user_version_insert AFTER INSERT ON user_user BEGIN " + SQLITE_BUMP + " END",
+            "CREATE TRIGGER user_user_version_update AFTER UPDATE ON user_user BEGIN " + SQLITE_BUMP + " END",
+            "CREATE TRIGGER user_user_version_delete AFTER DELETE ON user_user BEGIN " + SQLITE_BUMP + " END",
+        ],
+        [
+            'DROP TRIGGER user_user_version_insert',
+            'DROP TRIGGER user_user_version_update',
+            'DROP TRIGGER user_user_version_delete',
+        ],
+    ),
+    'postgresql': (
+        [
+            "CREATE TRIGGER user_user_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON user_user "
+            "FOR EACH STATEMENT EXECUTE FUNCTION api_table_version_bump()",
+        ],
+        ['DROP TRIGGER user_user_version ON user_user'],
+    ),
+}
+
+
+def install_triggers(apps, schema_editor):
+    TableVersion = apps.get_model('api', 'TableVersion')
+    TableVersion.objects.using(schema_editor.connection.alias).update_or_create(
+        table_name='user_user', defaults={'changed_at': timezone.now()})
+    for statement in TRIGGERS.get(schema_editor.connection.vendor, ([], []))[0]:
+        schema_editor.execute(statement, None)
+
+
+def drop_triggers(apps, schema_editor):
+    for statement in TRIGGERS.get(schema_editor.connection.vendor, ([], []))[1]:
+        schema_editor.execute(statement, None)
+    TableVersion = apps.get_model('api', 'TableVersion')
+    TableVersion.objects.using(schema_editor.connection.alias).filter(table_name='user_user').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_table_version'),
+        ('user', '0007_user_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
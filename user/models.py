@@ -8,3 +8,6 @@ from django.db.models import ImageField
 
 class User(AbstractUser):
     profile_picture = ImageField(upload_to='profile-pictures/', null=True, max_length=255)
+    # names of the resized copies of profile_picture, {"<size>": {"<format>": name}}
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
@@ -0,0 +1,53 @@
+"""
+Password hashing on a bounded pool of threads.
+
+The hashers spend their time in ``hashlib`` (PBKDF2, scrypt), which releases the
+GIL, so hashing on threads runs in parallel without blocking other requests or
+an event loop. The pool caps how many hashes run at once, so a burst of signups
+cannot starve the process of CPU.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count(),
+                thread_name_prefix='password-hash'
+            )
+        return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'PASSWORD_HASH_WORKERS':
+        _executor = None
+
+
+def hash_password(raw_password):
+    return get_executor().submit(make_password, raw_password).result()
+
+
+def hash_passwords(raw_passwords):
+    """
+    Hash many passwords in parallel, keeping their order.
+    """
+    return list(get_executor().map(make_password, raw_passwords))
+
+
+async def ahash_password(raw_password):
+    return await asyncio.wrap_future(get_executor().submit(make_password, raw_password))
@@ -1,31 +1,103 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from api.bulk import BulkListSerializer
+from api.metrics import TimedSerializerMixin
+from api.sparse import SparseFieldsSerializerMixin
 from user.models import User
+from user.passwords import ahash_password, hash_password, hash_passwords
 
 
-class UserSerializer(serializers.ModelSerializer):
+def variant_urls(variants, request=None):
+    """
+    Map ``{"<size>": {"<format>": name}}`` of stored profile picture variants to URLs,
+    absolute ones when ``request`` is given.
+    """
+    storage = User._meta.get_field('profile_picture').storage
+
+    def url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return {
+        size: {extension: url(name) for extension, name in formats.items()}
+        for size, formats in (variants or {}).items()
+    }
+
+
+class ProfilePictureVariantsField(serializers.Field):
+    """
+    URLs of the thumbnails generated for the profile picture. Empty until the
+    background processing of a new upload has finished.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(value, self.context.get('request'))
+
+
+class UserListSerializer(BulkListSerializer):
+    """
+    List serializer registering many users with one ``bulk_create``, the
+    passwords being hashed in parallel beforehand.
+    """
+
+    def validate_items(self, items):
+        validated, errors = super().validate_items(items)
+        seen = set()
+        for index, attrs in list(validated.items()):
+            if attrs['username'] in seen:
+                errors[index] = {"username": ["Duplicate username: {}".format(attrs['username'])]}
+                del validated[index]
+            seen.add(attrs['username'])
+        return validated, errors
+
+    def create(self, validated_data):
+        passwords = hash_passwords([attrs['password'] for attrs in validated_data])
+        return User.objects.bulk_create(
+            [User(**dict(attrs, password=password)) for attrs, password in zip(validated_data, passwords)],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    profile_picture_variants = ProfilePictureVariantsField()
 
     class Meta:
         model = User
-        fields = ("username", "password", "first_name", "last_name", "email", "profile_picture")
+        fields = ("username", "password", "first_name", "last_name", "email", "profile_picture",
+                  "profile_picture_variants")
+        list_serializer_class = UserListSerializer
 
     def create(self, validated_data):
+        # hash before the INSERT: a single write, and no row ever holds the raw password
+        validated_data['password'] = hash_password(validated_data['password'])
         user = super(UserSerializer, self).create(validated_data)
-        user.set_password(validated_data['password'])
-        user.save()
+
+        user.password = None
+        return user
+
+    async def acreate(self, validated_data):
+        validated_data['password'] = await ahash_password(validated_data['password'])
+        user = await User.objects.acreate(**validated_data)
 
         user.password = None
         return user
 
 
-class UserWithoutPasswordSerializer(serializers.ModelSerializer):
+class UserWithoutPasswordSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    profile_picture_variants = ProfilePictureVariantsField()
 
     class Meta:
         model = User
-        fields = ("id", "username", "first_name", "last_name", "email", "profile_picture")
+        fields = ("id", "username", "first_name", "last_name", "email", "profile_picture",
+                  "profile_picture_variants")
 
 
-class UserUpdatableFieldSerializer(serializers.ModelSerializer):
+class UserUpdatableFieldSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
@@ -1,12 +1,31 @@
+import io
 import json
+import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.views import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from api.fast import RowSerializer
+from api.tests import read_streaming
+from api.orm import update_returning
+from user.authentication import user_cache
 from user.serializers import UserSerializer, UserWithoutPasswordSerializer
+from user.tokens import RefreshToken, blacklist_filter, prune_expired_tokens
+from user.thumbnails import generate_profile_picture_variants
 
 User = get_user_model()
 
@@ -125,6 +144,9 @@ class BaseViewTest(APITestCase):
         )
 
     def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        blacklist_filter.reset()
         # add test data
         self.user = User.objects.create_superuser(
             username="admin",
@@ -198,6 +220,65 @@ class AuthLoginUserTest(BaseViewTest):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class RefreshTokenBlacklistTest(BaseViewTest):
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), data={'refresh': token}, format='json')
+
+    def test_rotated_token_cannot_be_reused(self):
+        """
+        This test ensures that a refresh token is blacklisted once it
+        has been rotated
+        """
+        refresh = self.login_a_user("admin", "testing").data["refresh"]
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("refresh", response.data)
+
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.refresh(self.refresh(self.login_a_user("admin", "testing").data["refresh"]).data["refresh"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_filter_skips_blacklist_query(self):
+        """
+        This test ensures that tokens missing from the filter are accepted
+        without querying the blacklist
+        """
+        refresh = self.login_a_user("admin", "testing").data["refresh"]
+        blacklist_filter.sync()
+        with self.assertNumQueries(0):
+            RefreshToken(refresh)
+
+    def test_filter_syncs_from_database(self):
+        """
+        This test ensures that tokens blacklisted by another process are
+        rejected once the filter has synced
+        """
+        refresh = self.login_a_user("admin", "testing").data["refresh"]
+        blacklist_filter.sync()
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=RefreshToken(refresh)["jti"]))
+
+        with override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0):
+            response = self.refresh(refresh)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_expired_tokens(self):
+        """
+        This test ensures that expired tokens are deleted with their
+        blacklist entries
+        """
+        refresh = self.login_a_user("admin", "testing").data["refresh"]
+        self.refresh(refresh)
+        self.login_a_user("admin", "testing")
+        OutstandingToken.objects.filter(jti=RefreshToken(refresh, verify=False)["jti"]).update(expires_at=timezone.now())
+
+        self.assertEqual(prune_expired_tokens(batch_size=1), 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
 class AuthRegisterUserTest(BaseViewTest):
     """
     Tests for auth/register/ endpoint
@@ -218,6 +299,53 @@ class AuthRegisterUserTest(BaseViewTest):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class SingleWriteRegisterUserTest(BaseViewTest):
+
+    def bulk_register(self, items):
+        return self.client.post(
+            reverse("user-bulk-register", kwargs={"version": "v1"}),
+            data=items,
+            format='json'
+        )
+
+    def test_register_with_single_insert(self):
+        """
+        This test ensures that a registration hashes the password before
+        inserting the user, without a second write
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register_user("single", "single_pass", "single@mail.com", "first", "last", None)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        writes = [q['sql'] for q in queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        self.assertTrue(User.objects.get(username="single").check_password("single_pass"))
+
+    def test_bulk_register(self):
+        """
+        This test ensures that admins can register many users at once and
+        that invalid or duplicate items are reported per item
+        """
+        items = [
+            {"username": "bulk1", "password": "bulk_pass1", "email": "bulk1@mail.com"},
+            {"username": "bulk2", "password": "bulk_pass2"},
+            {"username": "bulk1", "password": "bulk_pass3"},
+            {"username": "admin", "password": "bulk_pass4"},
+        ]
+        self.login_client('test_user', 'test_password')
+        response = self.bulk_register(items)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.login_client('admin', 'testing')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk_register(items)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created", "created", "error", "error"])
+        self.assertNotIn("password", response.data["results"][0]["data"])
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT')]), 1)
+        self.assertTrue(User.objects.get(username="bulk2").check_password("bulk_pass2"))
+
+
 class GetUserDetailsTest(BaseViewTest):
 
     def test_get_user_details(self):
@@ -301,3 +429,587 @@ class UpdateUserTest(BaseViewTest):
             }
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ExportUsersTest(BaseViewTest):
+
+    def test_export_users(self):
+        """
+        This test ensures that active users are streamed as one JSON
+        object per line, in the same shape as the list endpoint
+        """
+        User.objects.filter(username="test_user1").update(is_active=False)
+        response = self.client.get(reverse("user-export", kwargs={"version": "v1"}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(read_streaming(response)).decode().splitlines()
+        exported = [json.loads(line) for line in lines]
+        listed = self.client.get(reverse("user-list", kwargs={"version": "v1"})).data
+        self.assertEqual(exported, [dict(user) for user in listed])
+        self.assertNotIn("test_user1", [user["username"] for user in exported])
+
+
+class CachedUserDetailsTest(BaseViewTest):
+
+    def test_user_details_are_cached(self):
+        """
+        This test ensures that user details are served from the cache
+        until the user is updated or deactivated
+        """
+        response = self.get_user_details(2)
+        self.assertEqual(response["X-Cache"], "MISS")
+        response = self.get_user_details(2)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        self.login_client('test_user', 'test_password')
+        self.update_user(version="v1", id=2, data={'last_name': 'cached'})
+        response = self.get_user_details(2)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["last_name"], "cached")
+
+        user = User.objects.get(pk=2)
+        user.is_active = False
+        user.save()
+        self.client.credentials()
+        response = self.get_user_details(2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CachedAuthenticationUserTest(BaseViewTest):
+
+    def test_deactivated_user_is_rejected(self):
+        """
+        This test ensures that a cached user loses access as soon as
+        they are deactivated
+        """
+        self.login_client('test_user', 'test_password')
+        url = reverse("user-list", kwargs={"version": "v1"})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        user = User.objects.get(username='test_user')
+        user.is_active = False
+        user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_refreshes_cached_user(self):
+        """
+        This test ensures that changes made through the update endpoint
+        are visible to the next authenticated request
+        """
+        self.login_client('test_user', 'test_password')
+        response = self.update_user(version="v1", id=2, data={'first_name': 'renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('2', user_cache._entries)
+
+        self.client.get(reverse("user-list", kwargs={"version": "v1"}))
+        self.assertEqual(user_cache.get(User, 2).first_name, 'renamed')
+
+
+class ConditionalUserTest(BaseViewTest):
+
+    def test_user_list_etag(self):
+        """
+        This test ensures that an unchanged user list is answered with
+        304 Not Modified
+        """
+        url = reverse("user-list", kwargs={"version": "v1"})
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        User.objects.filter(pk=2).update(is_active=False)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_details_etag(self):
+        response = self.get_user_details(1)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(
+            reverse("user-details", kwargs={"version": "v1", "pk": 1}),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_user_if_match(self):
+        etag = self.get_user_details(2)["ETag"]
+        self.login_client('test_user', 'test_password')
+
+        response = self.client.put(
+            reverse("user-update", kwargs={"version": "v1", "pk": 2}),
+            data={'last_name': 'stale'},
+            format='multipart',
+            HTTP_IF_MATCH='"outdated"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.client.put(
+            reverse("user-update", kwargs={"version": "v1", "pk": 2}),
+            data={'last_name': 'fresh'},
+            format='multipart',
+            HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_update_user_if_match_any_representation(self):
+        """
+        This test ensures that If-Match accepts the ETag of any representation
+        of the current user, whatever fields or media type it was fetched with
+        """
+        self.login_client('test_user', 'test_password')
+        url = reverse("user-details", kwargs={"version": "v1", "pk": 2})
+        for params, headers in [({"fields": "username"}, {}), ({}, {"HTTP_ACCEPT": "application/msgpack"})]:
+            etag = self.client.get(url, params, **headers)["ETag"]
+            self.assertNotEqual(etag, self.client.get(url)["ETag"])
+
+            response = self.client.put(
+                reverse("user-update", kwargs={"version": "v1", "pk": 2}),
+                data={'last_name': 'fresh'},
+                format='multipart',
+                HTTP_IF_MATCH=etag
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_update_other_user_if_match(self):
+        """
+        This test ensures that a non-owner is refused before the preconditions
+        are evaluated, so a 412 cannot reveal the user's modification state
+        """
+        self.login_client('test_user', 'test_password')
+        response = self.client.put(
+            reverse("user-update", kwargs={"version": "v1", "pk": 1}),
+            data={'last_name': 'stale'},
+            format='multipart',
+            HTTP_IF_MATCH='"outdated"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SingleQueryUpdateUserTest(BaseViewTest):
+
+    def test_update_user_validates_input(self):
+        """
+        This test ensures that invalid data is rejected instead of being
+        written to the user
+        """
+        self.login_client('test_user', 'test_password')
+        response = self.update_user(version="v1", id=2, data={'email': 'not an email'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(User.objects.get(pk=2).email, "email1@test.com")
+
+    def test_update_user_keeps_other_columns(self):
+        self.login_client('test_user', 'test_password')
+        password = User.objects.get(pk=2).password
+        response = self.update_user(version="v1", id=2, data={'first_name': 'changed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["first_name"], "changed")
+        self.assertEqual(response.data["last_name"], "last")
+
+        user = User.objects.get(pk=2)
+        self.assertEqual(user.first_name, "changed")
+        self.assertEqual(user.password, password)
+        self.assertTrue(user.profile_picture)
+
+    def test_update_returning_joined_filter(self):
+        """
+        This test ensures that update_returning updates exactly the rows
+        selected by a filter across a join
+        """
+        group = Group.objects.create(name="editors")
+        User.objects.get(pk=2).groups.add(group)
+        users = update_returning(User.objects.filter(groups__name="editors"), {'last_name': 'editor'})
+        self.assertEqual([user.pk for user in users], [2])
+        self.assertEqual(users[0].last_name, "editor")
+        self.assertEqual(User.objects.filter(last_name="editor").count(), 1)
+
+
+@override_settings(TASK_QUEUE_BACKEND='api.tasks.ImmediateBackend', MEDIA_ROOT=tempfile.mkdtemp())
+class ProfilePictureVariantsTest(BaseViewTest):
+
+    def picture(self, name):
+        return SimpleUploadedFile(name=name, content=open('pictures/test/test_image.jpg', 'rb').read(),
+                                  content_type='image/jpeg')
+
+    def test_register_generates_variants(self):
+        """
+        This test ensures that thumbnails of an uploaded profile picture
+        are generated once the registration is committed
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.register_user("pic_user", "new_pass", "pic@mail.com", "first", "last",
+                                          self.picture('pic.jpg'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["profile_picture_variants"], {})
+
+        user = User.objects.get(username="pic_user")
+        self.assertEqual(set(user.profile_picture_variants), {"64", "256", "1024"})
+        storage = User._meta.get_field('profile_picture').storage
+        with storage.open(user.profile_picture_variants["64"]["webp"]) as variant:
+            self.assertEqual(Image.open(variant).format, "WEBP")
+        with storage.open(user.profile_picture_variants["64"]["jpeg"]) as variant:
+            self.assertLessEqual(max(Image.open(variant).size), 64)
+
+        response = self.get_user_details(user.pk)
+        self.assertTrue(response.data["profile_picture_variants"]["256"]["jpeg"].startswith("http://testserver/"))
+
+    def test_update_replaces_variants(self):
+        self.login_client('test_user', 'test_password')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.update_user(version="v1", id=2, data={'profile_picture': self.picture('new.jpg')})
+        self.assertEqual(User.objects.get(pk=2).profile_picture_variants, {})
+
+        for callback in callbacks:
+            callback()
+        variants = User.objects.get(pk=2).profile_picture_variants
+        self.assertIn("new", variants["1024"]["webp"])
+
+    def test_stale_variants_are_discarded(self):
+        user = User.objects.get(pk=2)
+        old_picture = user.profile_picture.name
+        User.objects.filter(pk=2).update(profile_picture='profile-pictures/other.jpg')
+
+        generate_profile_picture_variants(user.pk, old_picture)
+        self.assertEqual(User.objects.get(pk=2).profile_picture_variants, {})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ServeProfilePictureTest(BaseViewTest):
+
+    def setUp(self):
+        super().setUp()
+        self.picture = User.objects.get(username='test_user').profile_picture
+        self.content = open('pictures/test/test_image.jpg', 'rb').read()
+        self.url = reverse("media", kwargs={"path": self.picture.name})
+
+    def test_content_hashed_names(self):
+        """
+        This test ensures that uploads are stored under a name derived
+        from their content, and that identical content is stored once
+        """
+        self.assertRegex(self.picture.name, r'^profile-pictures/captcha1\.[0-9a-f]{12}\.jpg$')
+        other = User.objects.get(username='test_user1').profile_picture
+        self.assertEqual(other.name, self.picture.name.replace('captcha1', 'captcha2'))
+
+    def test_serve_profile_picture(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(read_streaming(response)), self.content)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse("media", kwargs={"path": "../api/settings.py"}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_serve_byte_range(self):
+        """
+        This test ensures that byte ranges are answered with 206 Partial
+        Content, and unsatisfiable ones with 416
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(read_streaming(response)), self.content[10:20])
+        self.assertEqual(response["Content-Range"], "bytes 10-19/{}".format(len(self.content)))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(read_streaming(response)), self.content[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes={}-".format(len(self.content)))
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_sendfile_offload(self):
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.picture.name)
+        self.assertEqual(response.content, b"")
+
+
+class QueryBudgetUserTest(BaseViewTest):
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        """
+        This test ensures that listing users takes the same number of
+        queries however many users there are
+        """
+        url = reverse("user-list", kwargs={"version": "v1"})
+        before = self.count_queries(url)
+        User.objects.bulk_create([User(username="budget{}".format(i), password="!") for i in range(50)])
+        self.assertEqual(self.count_queries(url), before)
+
+    def test_query_budgets(self):
+        """
+        This test ensures that the user endpoints stay within the query
+        budgets of benchmarks/routes.py
+        """
+        self.login_client('admin', 'testing')
+        self.count_queries(reverse("user-list", kwargs={"version": "v1"}))
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse("user-list", kwargs={"version": "v1"}))
+        with self.assertNumQueries(2):
+            self.get_user_details(2)
+        with self.assertNumQueries(1):
+            self.update_user(version="v1", id=2, data={'first_name': 'budget'})
+
+
+class FastListUserTest(BaseViewTest):
+
+    def test_fast_list_is_byte_identical(self):
+        """
+        This test ensures that the values_list() path renders exactly the
+        bytes of the UserWithoutPasswordSerializer path, file URLs included
+        """
+        User.objects.filter(pk=2).update(
+            first_name="\u00c9mile\u2028", profile_picture_variants={"64": {"webp": "pictures/64.webp"}})
+        url = reverse("user-list", kwargs={"version": "v1"})
+        fast = self.client.get(url)
+        with mock.patch.object(RowSerializer, "compile", return_value=None):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        self.assertIn(b"http://testserver/", fast.content)
+
+
+class SparseFieldsUserTest(BaseViewTest):
+
+    @staticmethod
+    def details_url(pk):
+        return reverse("user-details", kwargs={"version": "v1", "pk": pk})
+
+    def user_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data=params)
+        return response, [q["sql"] for q in queries if '"user_user"."username"' in q["sql"]]
+
+    def test_fields(self):
+        """
+        This test ensures that ?fields= limits the user list and details
+        to the requested fields and columns
+        """
+        response, queries = self.user_queries(reverse("user-list", kwargs={"version": "v1"}), fields="id,username")
+        self.assertEqual(response.data[1], {"id": 2, "username": "test_user"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("first_name", queries[0])
+
+        response, queries = self.user_queries(self.details_url(2), fields="username")
+        self.assertEqual(response.data, {"username": "test_user"})
+        self.assertNotIn("first_name", queries[0])
+
+    def test_default_projection(self):
+        """
+        This test ensures that the password, permission flags and other
+        unused columns are not read without ?fields= either
+        """
+        for url in (reverse("user-list", kwargs={"version": "v1"}), self.details_url(2)):
+            response, queries = self.user_queries(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), 1)
+            for column in ('"password"', '"last_login"', '"is_superuser"', '"is_staff"', '"date_joined"'):
+                self.assertNotIn(column, queries[0])
+
+    def test_unknown_field(self):
+        response = self.client.get(self.details_url(2), data={"fields": "password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchUserTest(BaseViewTest):
+
+    def get_batch(self, ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-batch", kwargs={"version": "v1"}), data={"ids": ids})
+        return response, [q["sql"] for q in queries if '"user_user"' in q["sql"]]
+
+    def test_batch_active_users(self):
+        """
+        This test ensures that a batch of users keeps the requested order
+        and reports inactive and unknown users as missing
+        """
+        User.objects.filter(username="test_user1").update(is_active=False)
+        response, queries = self.get_batch("3,2,1,42")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user["id"] for user in response.data["results"]], [2, 1])
+        self.assertEqual(response.data["missing"], [3, 42])
+        self.assertNotIn("password", response.data["results"][0])
+        self.assertEqual(len(queries), 1)
+
+    def test_batch_shares_detail_cache(self):
+        """
+        This test ensures that batches and user details share their cache
+        entries
+        """
+        self.get_batch("1,2")
+        self.assertEqual(self.get_user_details(2)["X-Cache"], "HIT")
+        response, queries = self.get_batch("2,1")
+        self.assertEqual(response.data["results"][0], self.get_user_details(2).data)
+        self.assertEqual(queries, [])
+
+    def test_batch_out_of_range_ids(self):
+        """
+        This test ensures that ids the database cannot bind are reported as
+        invalid instead of failing in the driver
+        """
+        response, queries = self.get_batch("1,99999999999999999999")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["ids"], ["Invalid id(s): 99999999999999999999"])
+        self.assertEqual(queries, [])
+
+
+class SearchUsersTest(BaseViewTest):
+
+    def search(self, q):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-search", kwargs={"version": "v1"}), data={"q": q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue([query for query in queries if "MATCH" in query["sql"]])
+        return [user["username"] for user in response.data["results"]]
+
+    def test_search_users(self):
+        """
+        This test ensures that active users are found by username, names
+        and email, best matches first
+        """
+        self.assertEqual(self.search("test_user1"), ["test_user1"])
+        self.assertEqual(self.search("first1"), ["test_user1"])
+        self.assertEqual(self.search("email2 test.com"), ["test_user1"])
+        self.assertEqual(self.search("las"), ["test_user", "test_user1"])
+        self.assertEqual(self.search("admin"), ["admin"])
+
+        User.objects.filter(username="test_user").update(is_active=False)
+        self.assertEqual(self.search("las"), ["test_user1"])
+
+    def test_search_follows_updates(self):
+        self.login_client('test_user', 'test_password')
+        self.update_user(version="v1", id=2, data={'last_name': 'renamed'})
+        self.assertEqual(self.search("renamed"), ["test_user"])
+        self.assertEqual(self.search("last"), ["test_user1"])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PruneProfilePicturesTest(BaseViewTest):
+
+    def setUp(self):
+        super().setUp()
+        self.storage = User._meta.get_field('profile_picture').storage
+        self.picture = User.objects.get(username='test_user').profile_picture.name
+
+    def test_shared_file_survives_failed_update(self):
+        """
+        This test ensures that an update of an unknown user does not delete
+        the content-hashed file another user shares
+        """
+        self.login_client('admin', 'testing')
+        picture = SimpleUploadedFile(name='captcha1.jpg', content=open('pictures/test/test_image.jpg', 'rb').read(),
+                                     content_type='image/jpeg')
+        response = self.update_user(version="v1", id=99, data={'profile_picture': picture})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(self.storage.exists(self.picture))
+
+    def test_prune_unreferenced_files(self):
+        """
+        This test ensures that prune_profile_pictures deletes the files no
+        user refers to, once they are old enough
+        """
+        orphan = self.storage.save('profile-pictures/variants/orphan_64.webp', ContentFile(b'orphan'))
+        out = io.StringIO()
+        call_command('prune_profile_pictures', stdout=out)
+        self.assertTrue(self.storage.exists(orphan))
+
+        call_command('prune_profile_pictures', '--min-age', '0', '--dry-run', stdout=out)
+        self.assertTrue(self.storage.exists(orphan))
+
+        call_command('prune_profile_pictures', '--min-age', '0', stdout=out)
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(self.picture))
+        self.assertIn('Deleted 1 unreferenced file(s)', out.getvalue())
+
+
+# the same tests against the async user views, served by api.async_urls under ASGI
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncGetAllUsersTest(GetAllUsersTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncAuthRegisterUserTest(AuthRegisterUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSingleWriteRegisterUserTest(SingleWriteRegisterUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncGetUserDetailsTest(GetUserDetailsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncUpdateUserTest(UpdateUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncCachedUserDetailsTest(CachedUserDetailsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncCachedAuthenticationUserTest(CachedAuthenticationUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncConditionalUserTest(ConditionalUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSingleQueryUpdateUserTest(SingleQueryUpdateUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncProfilePictureVariantsTest(ProfilePictureVariantsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncQueryBudgetUserTest(QueryBudgetUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncFastListUserTest(FastListUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSparseFieldsUserTest(SparseFieldsUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncBatchUserTest(BatchUserTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF='api.async_urls')
+class AsyncSearchUsersTest(SearchUsersTest):
+    pass
@@ -0,0 +1,66 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from api.cache import detail_cache
+from api.tasks import enqueue_on_commit
+from user.models import User
+
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+
+def variant_name(name, size, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return 'profile-pictures/variants/{}_{}.{}'.format(stem, size, extension)
+
+
+def render_variants(image):
+    """
+    Yield ``(size, extension, bytes)`` for every configured thumbnail of ``image``
+    """
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    for size in settings.PROFILE_PICTURE_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        for extension in settings.PROFILE_PICTURE_FORMATS:
+            buffer = BytesIO()
+            thumbnail.save(buffer, FORMATS[extension], quality=settings.PROFILE_PICTURE_QUALITY)
+            yield size, extension, buffer.getvalue()
+
+
+def generate_profile_picture_variants(user_pk, name):
+    """
+    Resize the profile picture ``name`` of a user and record the variant names.
+
+    The variants are only recorded if the user still has the same picture. When
+    it was replaced in the meantime they are left for ``prune_profile_pictures``:
+    content-hashed files may be shared with other users.
+    """
+    storage = User._meta.get_field('profile_picture').storage
+    with storage.open(name) as picture:
+        image = Image.open(picture)
+        image.load()
+
+    variants = {}
+    for size, extension, content in render_variants(image):
+        saved = storage.save(variant_name(name, size, extension), ContentFile(content))
+        variants.setdefault(str(size), {})[extension] = saved
+
+    updated = User.objects.filter(pk=user_pk, profile_picture=name).update(
+        profile_picture_variants=variants,
+        updated_at=timezone.now()
+    )
+    if updated:
+        detail_cache.invalidate(User, user_pk)
+
+
+def schedule_profile_picture_variants(user):
+    if user.profile_picture:
+        enqueue_on_commit(generate_profile_picture_variants, user.pk, user.profile_picture.name)
@@ -0,0 +1,152 @@
+"""
+Refresh token blacklist.
+
+Every rotated refresh token is blacklisted (``BLACKLIST_AFTER_ROTATION``), so
+the blacklist only grows. Instead of querying it on every refresh, membership
+is first checked against an in-process Bloom filter warmed from the database;
+only a possible hit is confirmed with a query. Reusing a rotated token is always
+caught by the unique constraint on the blacklist when the token is rotated
+again, so the filter lagging behind other processes between syncs cannot let a
+token be refreshed twice. Expired tokens are deleted in batches in the
+background.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import serializers, tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from api.bloom import BloomFilter
+from api.tasks import enqueue_on_commit
+
+PRUNE_CACHE_KEY = 'token-blacklist:pruned'
+
+
+class BlacklistFilter:
+    """
+    Bloom filter of blacklisted token ids (``jti``).
+
+    It is built from the unexpired blacklist on first use, then kept up to date
+    with the rows added since the last sync, read by increasing primary key at
+    most every ``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds. It is rebuilt after
+    expired tokens were pruned and when it holds more items than its capacity.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._last_id = 0
+            self._synced_at = 0.0
+
+    def _load(self, queryset):
+        for pk, jti in queryset.order_by('id').values_list('id', 'token__jti').iterator():
+            self._bloom.add(jti)
+            self._last_id = max(self._last_id, pk)
+
+    def sync(self):
+        with self._lock:
+            if self._bloom is None or self._bloom.count > self._bloom.capacity:
+                self._bloom = BloomFilter(settings.TOKEN_BLACKLIST_FILTER_CAPACITY,
+                                          settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE)
+                self._last_id = 0
+                self._load(BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()))
+            elif time.monotonic() - self._synced_at >= settings.TOKEN_BLACKLIST_SYNC_INTERVAL:
+                self._load(BlacklistedToken.objects.filter(id__gt=self._last_id))
+            else:
+                return
+            self._synced_at = time.monotonic()
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        with self._lock:
+            return jti in self._bloom
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def prune_expired_tokens(batch_size=None):
+    """
+    Delete expired outstanding tokens, and their blacklist entries, in batches.
+    """
+    batch_size = batch_size or settings.TOKEN_BLACKLIST_PRUNE_BATCH_SIZE
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now()).order_by('id')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    if deleted:
+        blacklist_filter.reset()
+    return deleted
+
+
+def schedule_prune():
+    """
+    Queue ``prune_expired_tokens`` at most once per ``TOKEN_BLACKLIST_PRUNE_INTERVAL``.
+    """
+    if cache.add(PRUNE_CACHE_KEY, True, timeout=settings.TOKEN_BLACKLIST_PRUNE_INTERVAL):
+        enqueue_on_commit(prune_expired_tokens)
+
+
+class RefreshToken(tokens.RefreshToken):
+
+    def verify(self, *args, **kwargs):
+        # check the expiry and signature first so expired tokens never reach the blacklist
+        tokens.Token.verify(self, *args, **kwargs)
+        self.check_blacklist()
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in blacklist_filter and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted, created
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                _blacklisted, created = refresh.blacklist()
+                if not created:
+                    # rotated concurrently, or blacklisted by another process since the last sync
+                    raise TokenError(_("Token is blacklisted"))
+                schedule_prune()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
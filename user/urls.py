@@ -1,10 +1,15 @@
 from django.urls import path
 
-from user.views import UserRegisterView, UserListView, UserDetailsView, UserUpdateView
+from user.views import (UserRegisterView, UserBulkRegisterView, UserListView, UserExportView, UserDetailsView,
+                        UserBatchView, UserSearchView, UserUpdateView)
 
 urlpatterns = [
     path("", UserRegisterView.as_view(), name="user-register"),
+    path("bulk", UserBulkRegisterView.as_view(), name="user-bulk-register"),
     path("list", UserListView.as_view(), name="user-list"),
+    path("batch", UserBatchView.as_view(), name="user-batch"),
+    path("search", UserSearchView.as_view(), name="user-search"),
+    path("export", UserExportView.as_view(), name="user-export"),
     path("<str:pk>/details", UserDetailsView.as_view(), name="user-details"),
     path("<str:pk>/update", UserUpdateView.as_view(), name="user-update"),
 ]
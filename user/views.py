@@ -1,9 +1,24 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 
-from user.serializers import UserSerializer, UserWithoutPasswordSerializer, UserUpdatableFieldSerializer
+from api.batch import BatchRetrieveMixin
+from api.bulk import BulkMixin
+from api.cache import CachedRetrieveMixin, get_lookup_pk
+from api.conditional import (ConditionalGetMixin, ListValidatorsMixin, ObjectValidatorsMixin, conditional,
+                             precondition_failed)
+from api.export import file_url, ndjson_response
+from api.fast import FastListMixin
+from api.orm import save_file, send_post_save, update_returning
+from api.pagination import SearchPagination
+from api.search import SearchFilter
+from api.sparse import SparseFieldsMixin
+
+from user.serializers import UserSerializer, UserWithoutPasswordSerializer, UserUpdatableFieldSerializer, variant_urls
+from user.thumbnails import schedule_profile_picture_variants
 
 User = get_user_model()
 
@@ -17,8 +32,34 @@ class UserRegisterView(generics.CreateAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = UserSerializer
 
+    def perform_create(self, serializer):
+        schedule_profile_picture_variants(serializer.save())
+
+
+class UserBulkRegisterView(BulkMixin, generics.GenericAPIView):
+    """
+    Register many users in one request and one INSERT, admins only
+    """
+    queryset = User.objects.all()
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = UserSerializer
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        serializer = self.get_serializer(many=True)
+        validated, errors = serializer.validate_items(dict(enumerate(items)))
+
+        with transaction.atomic():
+            users = serializer.create(list(validated.values()))
+
+        results = {
+            index: {"index": index, "status": "created", "data": UserWithoutPasswordSerializer(user).data}
+            for index, user in zip(validated, users)
+        }
+        return self.bulk_response(results, errors, status.HTTP_201_CREATED)
+
 
-class UserListView(generics.ListAPIView):
+class UserListView(SparseFieldsMixin, ConditionalGetMixin, ListValidatorsMixin, FastListMixin, generics.ListAPIView):
     """
     Get active user lists
     """
@@ -27,7 +68,42 @@ class UserListView(generics.ListAPIView):
     serializer_class = UserWithoutPasswordSerializer
 
 
-class UserDetailsView(generics.RetrieveAPIView):
+class UserSearchView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    Full-text search of active users by username, first and last name and email
+    with ``?q=``, best matches first
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+    filter_backends = [SearchFilter]
+    pagination_class = SearchPagination
+    search_fields = ('username', 'first_name', 'last_name', 'email')
+
+
+class UserExportView(generics.GenericAPIView):
+    """
+    Stream active users as newline-delimited JSON
+    """
+    queryset = User.objects.all().filter(is_active=True).order_by('pk')
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    def get(self, request, *args, **kwargs):
+        storage = User._meta.get_field('profile_picture').storage
+        return ndjson_response(
+            self.get_queryset(),
+            UserWithoutPasswordSerializer.Meta.fields,
+            transforms={
+                'profile_picture': file_url(request, storage),
+                'profile_picture_variants': lambda variants: variant_urls(variants, request),
+            },
+            filename='users.ndjson'
+        )
+
+
+class UserDetailsView(SparseFieldsMixin, ConditionalGetMixin, ObjectValidatorsMixin, CachedRetrieveMixin,
+                      generics.RetrieveAPIView):
     """
     Retrieve user details by user_id
     """
@@ -36,7 +112,19 @@ class UserDetailsView(generics.RetrieveAPIView):
     serializer_class = UserWithoutPasswordSerializer
 
 
-class UserUpdateView(generics.UpdateAPIView):
+class UserBatchView(SparseFieldsMixin, BatchRetrieveMixin, generics.GenericAPIView):
+    """
+    Retrieve many active users by user_id with ``?ids=1,5,9``
+    """
+    queryset = User.objects.all().filter(is_active=True)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = UserWithoutPasswordSerializer
+
+    def get(self, request, *args, **kwargs):
+        return self.batch_retrieve(request, *args, **kwargs)
+
+
+class UserUpdateView(ObjectValidatorsMixin, generics.UpdateAPIView):
     """
     Takes first_name, last_name, email, and profile picture then return updated user
     to update existing user. This operation just could be accessed by admin user or the users themselves.
@@ -46,19 +134,9 @@ class UserUpdateView(generics.UpdateAPIView):
 
     def put(self, request, *args, **kwargs):
 
+        # authorize before the preconditions, a 412 would tell whether the user changed
         if request.user.is_superuser or str(request.user.pk) == kwargs["pk"]:
-            try:
-                user = self.queryset.get(pk=kwargs["pk"])
-                serializer = UserUpdatableFieldSerializer()
-                updated_user = serializer.update(user, request.data)
-                return Response(UserWithoutPasswordSerializer(updated_user).data)
-            except User.DoesNotExist:
-                return Response(
-                    data={
-                        "message": "User with id: {} does not exist".format(kwargs["pk"])
-                    },
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            return self.update_user(request, *args, **kwargs)
         else:
             return Response(
                 data={
@@ -66,3 +144,33 @@ class UserUpdateView(generics.UpdateAPIView):
                 },
                 status=status.HTTP_401_UNAUTHORIZED
             )
+
+    @conditional
+    def update_user(self, request, *args, **kwargs):
+        serializer = UserUpdatableFieldSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        # a single UPDATE of the submitted columns which also returns the row
+        pk = get_lookup_pk(self)
+        values = dict(serializer.validated_data, updated_at=timezone.now())
+        if values.get('profile_picture'):
+            values['profile_picture'] = save_file(User, 'profile_picture', values['profile_picture'])
+            values['profile_picture_variants'] = {}
+        queryset = self.precondition_queryset(self.get_queryset().filter(pk=pk))
+        users = update_returning(queryset, values) if pk is not None else []
+        if not users:
+            if self.matched_last_modified is not None:
+                # changed since the preconditions were checked
+                return precondition_failed()
+            # content-hashed files may be shared with other users; prune_profile_pictures collects them
+            return Response(
+                data={
+                    "message": "User with id: {} does not exist".format(kwargs["pk"])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        send_post_save(users[0], values)
+        if values.get('profile_picture'):
+            schedule_profile_picture_variants(users[0])
+        return Response(UserWithoutPasswordSerializer(users[0]).data)